@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+
+"""
+Measure the latency of the master pipeline, from the execution_start API call to the running state.
+
+Usage: master_benchmark.py [options] [zoe options]
+
+The master runs in this process with the in-memory state backend and, unless --swarm-url says otherwise,
+a simulated Swarm cluster. Client threads create executions in the state and start them through the ZeroMQ
+API, as the Zoe API process does, wait for them to be running and terminate them.
+
+For each execution the time spent in each stage is measured from the status changes recorded in the state:
+
+* request: round trip of the execution_start API call
+* digest: from the scheduled status to the creation of the services
+* queue: from the creation of the services to the starting status
+* containers: from the starting status to the running status
+* total: from the API call to the running status
+
+Each stage starts from the first time the execution entered a status, so the time lost in failed start attempts
+and their retry delays is counted in the containers stage.
+
+Options not recognized by the benchmark are passed to the Zoe configuration, for example --scheduler-policy.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+
+import zoe_lib.config as config
+from zoe_lib.memory_state import MemoryStateManager
+from zoe_lib.metrics.base import set_metric_sender
+from zoe_lib.metrics.logging import LogMetricSender
+from zoe_lib.sql_manager import Execution
+
+from zoe_master.cluster_state import ZoeClusterState
+from zoe_master.master_api import APIManager
+from zoe_master.monitor import ZoeMonitor
+from zoe_master.runtime_estimator import ZoeRuntimeEstimator
+from zoe_master.scheduler import ZoeScheduler
+
+import zoe_api.master_api
+
+log = logging.getLogger("main")
+LOG_FORMAT = '%(asctime)-15s %(levelname)s %(threadName)s->%(name)s: %(message)s'
+
+STAGES = ['request', 'digest', 'queue', 'containers', 'total']
+
+
+class BenchmarkState(MemoryStateManager):
+    """In-memory state that records when each execution changes status."""
+    def __init__(self):
+        super().__init__()
+        self.timestamps = {}
+        self.changed = threading.Condition()
+
+    def execution_update(self, exec_id, **kwargs):
+        """Record the first time the execution enters each status."""
+        super().execution_update(exec_id, **kwargs)
+        if 'status' in kwargs:
+            with self.changed:
+                self.timestamps.setdefault(int(exec_id), {}).setdefault(kwargs['status'], time.time())  # retries go through the same statuses again
+                self.changed.notify_all()
+
+    def services_new(self, execution_id, services):
+        """Record the time the services of an execution have been created."""
+        service_ids = super().services_new(execution_id, services)
+        with self.changed:
+            self.timestamps.setdefault(int(execution_id), {})['digested'] = time.time()
+        return service_ids
+
+    def wait_status(self, exec_id, statuses, timeout):
+        """Wait until the execution reaches one of the statuses, return it or None on timeout."""
+        deadline = time.time() + timeout
+        with self.changed:
+            while True:
+                execution = self.execution_list(only_one=True, id=exec_id)
+                if execution.status in statuses:
+                    return execution.status
+                if time.time() >= deadline:
+                    return None
+                self.changed.wait(deadline - time.time())
+
+
+def synthetic_zapp(args):
+    """A ZApp description with the shape given on the command line."""
+    services = []
+    for idx in range(args.services):
+        services.append({
+            'name': 'worker{}'.format(idx),
+            'docker_image': 'zoe-benchmark',
+            'monitor': idx == 0,
+            'ports': [],
+            'environment': [['EXECUTION', '{execution_name}']],
+            'required_resources': {'memory': int(args.service_memory * 1024 ** 2)},
+            'total_count': 1 + (args.elastic if idx == 0 else 0),
+            'essential_count': 1,
+            'startup_order': idx
+        })
+    return {
+        'name': 'benchmark',
+        'version': 2,
+        'will_end': True,
+        'priority': 512,
+        'requires_binary': False,
+        'services': services
+    }
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    if len(values) == 0:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Benchmark:
+    """Client threads driving the master API."""
+    def __init__(self, args, state, description):
+        self.args = args
+        self.state = state
+        self.description = description
+        self.counter = iter(range(args.executions))
+        self.lock = threading.Lock()
+        self.samples = dict([(stage, []) for stage in STAGES])
+        self.failures = 0
+
+    def client(self):
+        """Start executions one after the other until the total number has been reached."""
+        api = zoe_api.master_api.APIManager()
+        while True:
+            with self.lock:
+                idx = next(self.counter, None)
+            if idx is None:
+                break
+            exec_id = self.state.execution_new('bench-{}'.format(idx), 'benchmark', self.description)
+            time_request = time.time()
+            success, message = api.execution_start(exec_id)
+            time_reply = time.time()
+            if not success:
+                log.error('Cannot start execution {}: {}'.format(exec_id, message))
+                self._failure()
+                continue
+
+            status = self.state.wait_status(exec_id, (Execution.RUNNING_STATUS, Execution.ERROR_STATUS), self.args.timeout)
+            if status == Execution.RUNNING_STATUS:
+                self._record(exec_id, time_request, time_reply)
+            else:
+                log.error('Execution {} did not reach the running state: {}'.format(exec_id, status))
+                self._failure()
+
+            time.sleep(self.args.hold)
+            api.execution_terminate(exec_id)
+            self.state.wait_status(exec_id, (Execution.TERMINATED_STATUS, Execution.ERROR_STATUS), self.args.timeout)
+
+    def _record(self, exec_id, time_request, time_reply):
+        with self.state.changed:
+            times = dict(self.state.timestamps[exec_id])
+        with self.lock:
+            self.samples['request'].append(time_reply - time_request)
+            self.samples['digest'].append(times['digested'] - times[Execution.SCHEDULED_STATUS])
+            self.samples['queue'].append(times[Execution.STARTING_STATUS] - times['digested'])
+            self.samples['containers'].append(times[Execution.RUNNING_STATUS] - times[Execution.STARTING_STATUS])
+            self.samples['total'].append(times[Execution.RUNNING_STATUS] - time_request)
+
+    def _failure(self):
+        with self.lock:
+            self.failures += 1
+
+    def run(self):
+        """Run the client threads and print the results."""
+        threads = [threading.Thread(target=self.client, name='client{}'.format(i)) for i in range(self.args.concurrency)]
+        time_start = time.time()
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        elapsed = time.time() - time_start
+
+        started = len(self.samples['total'])
+        print('{} executions running, {} failures, {:.1f}s, {:.2f} executions/s'.format(started, self.failures, elapsed, started / elapsed))
+        print('{:<12} {:>10} {:>10} {:>10} {:>10} {:>10}'.format('stage (ms)', 'mean', 'p50', 'p90', 'p99', 'max'))
+        for stage in STAGES:
+            values = [v * 1000 for v in self.samples[stage]]
+            mean = sum(values) / len(values) if len(values) > 0 else 0
+            print('{:<12} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f}'.format(stage, mean, percentile(values, 0.5), percentile(values, 0.9), percentile(values, 0.99), max(values) if len(values) > 0 else 0))
+
+
+def process_arguments():
+    """Parse the benchmark options, the others are left for the Zoe configuration."""
+    argparser = argparse.ArgumentParser(description='Zoe master benchmark', epilog='Other options are passed to the Zoe configuration')
+    argparser.add_argument('--executions', type=int, default=100, help='Total number of executions to start')
+    argparser.add_argument('--concurrency', type=int, default=4, help='Number of client threads')
+    argparser.add_argument('--hold', type=float, default=0, help='Seconds each execution is left running before terminating it')
+    argparser.add_argument('--timeout', type=float, default=60, help='Seconds to wait for an execution to start or terminate')
+    argparser.add_argument('--zapp', type=argparse.FileType('r'), help='ZApp description to use, instead of the synthetic one')
+    argparser.add_argument('--services', type=int, default=2, help='Essential services in the synthetic ZApp')
+    argparser.add_argument('--elastic', type=int, default=0, help='Elastic services in the synthetic ZApp')
+    argparser.add_argument('--service-memory', type=float, default=512, help='Memory of each service in the synthetic ZApp, in MiB')
+    argparser.add_argument('--swarm-url', default='fake://?nodes=10&node_memory=64GiB&latency=0.005', help='Swarm endpoint, the default is a simulated cluster')
+    argparser.add_argument('--master-uri', default='tcp://127.0.0.1:4859', help='Address for the ZeroMQ API of the benchmarked master')
+    return argparser.parse_known_args()
+
+
+def main():
+    """Main."""
+    args, zoe_args = process_arguments()
+    sys.argv = sys.argv[:1] + zoe_args
+    config.load_configuration()
+    conf = config.get_conf()
+    conf.state_backend = 'memory'
+    conf.swarm = args.swarm_url
+    conf.api_listen_uri = args.master_uri
+    conf.master_url = args.master_uri
+    conf.deployment_name = 'benchmark'
+    conf.gelf_address = ''
+    conf.orphan_gc_interval = 0
+
+    logging.basicConfig(level=logging.DEBUG if conf.debug else logging.WARNING, format=LOG_FORMAT)
+
+    description = json.load(args.zapp) if args.zapp is not None else synthetic_zapp(args)
+
+    metrics = LogMetricSender(conf.deployment_name)
+    set_metric_sender(metrics)
+    state = BenchmarkState()
+    cluster_state = ZoeClusterState()
+    scheduler = ZoeScheduler(cluster_state, ZoeRuntimeEstimator(state))
+    monitor = ZoeMonitor(state, cluster_state)
+    api_server = APIManager(metrics, scheduler, state, cluster_state)
+    threading.Thread(target=api_server.loop, name='master_api', daemon=True).start()
+
+    try:
+        Benchmark(args, state, description).run()
+    finally:
+        scheduler.quit()
+        monitor.quit()
+        cluster_state.quit()
+        metrics.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+
+"""
+Replay a workload trace against the Zoe scheduler policies on a simulated cluster.
+
+Usage: scheduler_sim.py [options] <trace_file>
+
+The trace is a CSV file in the format produced by boinc_trace.py. The id, time_submit, time_start, time_end and
+mem_usage columns are used, a user_id column is used by the FAIR policy if present. Each line becomes an execution
+with a single essential service reserving mem_usage bytes and running for time_end - time_start seconds.
+
+No Docker or database is needed: the policies, placement and backfilling code of the master are driven by
+a discrete event simulation. For each policy the makespan, the distribution of queue waiting times, the memory
+utilization and the bounded slowdown are reported.
+"""
+
+import argparse
+import csv
+import datetime
+import heapq
+
+from zoe_lib.sql_manager import Execution
+
+import zoe_master.backfill as backfill
+from zoe_master.placement import ZoePlacement
+from zoe_master.scheduler_policies.fair_share import FairSharePolicy, parse_weights
+from zoe_master.scheduler_policies.fifo import FIFOPolicy
+from zoe_master.scheduler_policies.size_based import SizeBasedPolicy
+from zoe_master.stats import SwarmStats, SwarmNodeStats
+
+GB = 1024 ** 3
+SLOWDOWN_THRESHOLD = 10  # seconds, run times shorter than this do not inflate the bounded slowdown
+
+SUBMIT_EVENT = 0
+END_EVENT = 1
+
+
+def load_trace(filename, default_memory):
+    """Read the trace and return a list of (id, user, submit time, run time, memory)."""
+    jobs = []
+    with open(filename, 'r') as trace_file:
+        for row in csv.DictReader(trace_file):
+            if row['time_start'] in ('', 'None') or row['time_end'] in ('', 'None'):
+                continue
+            runtime = float(row['time_end']) - float(row['time_start'])
+            memory = int(float(row.get('mem_usage', 0) or 0))
+            if memory <= 0:
+                memory = default_memory
+            jobs.append((int(row['id']), row.get('user_id', 'trace'), float(row['time_submit']), max(runtime, 0), memory))
+    return sorted(jobs, key=lambda j: j[2])
+
+
+def make_execution(job):
+    """Build a detached Execution object for a trace line."""
+    exec_id, user_id, time_submit, runtime_, memory = job
+    description = {
+        'name': 'trace',
+        'priority': 512,
+        'services': [{
+            'name': 'job',
+            'required_resources': {'memory': memory},
+            'essential_count': 1,
+            'total_count': 1,
+            'startup_order': 0
+        }]
+    }
+    return Execution({
+        'id': exec_id,
+        'user_id': user_id,
+        'name': 'trace-{}'.format(exec_id),
+        'description': description,
+        'status': Execution.SCHEDULED_STATUS,
+        'time_submit': datetime.datetime.fromtimestamp(time_submit),
+        'time_start': None,
+        'time_end': None,
+        'error_message': None
+    }, None)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    if len(values) == 0:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class SimulatedEstimator:
+    """Run time estimates for the simulation, from the executions terminated so far or from the trace itself."""
+    def __init__(self, runtimes, oracle):
+        self.runtimes = runtimes
+        self.oracle = oracle
+        self.history = []
+
+    def estimate(self, execution):
+        """Expected run time in seconds, None if unknown."""
+        if self.oracle:
+            return self.runtimes[execution.id]
+        if len(self.history) == 0:
+            return None
+        return sum(self.history) / len(self.history)
+
+    def record(self, runtime):
+        """Add a terminated execution to the history."""
+        self.history.append(runtime)
+
+
+class SimulatedCluster:
+    """A set of nodes with a fixed amount of memory."""
+    def __init__(self, node_count, node_memory):
+        self.memory_total = dict([('node{}'.format(i), node_memory) for i in range(node_count)])
+        self.memory_reserved = dict([(name, 0) for name in self.memory_total])
+
+    def snapshot(self):
+        """The cluster status, in the format returned by SwarmClient.info()."""
+        stats = SwarmStats()
+        for name in sorted(self.memory_total):
+            node = SwarmNodeStats(name)
+            node.memory_total = self.memory_total[name]
+            node.memory_reserved = self.memory_reserved[name]
+            node.status = 'Healthy'
+            stats.nodes.append(node)
+        stats.memory_total = sum(self.memory_total.values())
+        return stats
+
+
+class Simulator:
+    """Replays the trace with one scheduler policy."""
+    def __init__(self, jobs, args, policy_name, use_backfill):
+        self.jobs = jobs
+        self.args = args
+        self.use_backfill = use_backfill
+        self.cluster = SimulatedCluster(args.nodes, args.node_memory * GB)
+        self.estimator = SimulatedEstimator(dict([(j[0], j[3]) for j in jobs]), args.oracle)
+        self.now = 0
+        if policy_name == 'SIZE':
+            self.queue = SizeBasedPolicy(self.estimator, args.size_aging_time)
+            self.queue.clock = lambda: datetime.datetime.fromtimestamp(self.now)
+        elif policy_name == 'FAIR':
+            self.queue = FairSharePolicy(parse_weights(args.fair_share_weights))
+        else:
+            self.queue = FIFOPolicy()
+        self.running = {}  # execution ID -> (execution, [(node, memory)])
+        self.events = []
+        self.event_count = 0
+        self.waits = []
+        self.slowdowns = []
+        self.used_memory_time = 0
+
+    def run(self):
+        """Run the simulation and return the results."""
+        max_memory = max(self.cluster.memory_total.values())
+        for job in self.jobs:
+            if job[4] > max_memory:
+                print('Execution {} needs more memory than any node, skipping it'.format(job[0]))
+                continue
+            self._push(job[2], SUBMIT_EVENT, make_execution(job))
+
+        first_submit = self.events[0][0] if len(self.events) > 0 else 0
+        last_end = first_submit
+        while len(self.events) > 0:
+            self.now = self.events[0][0]
+            while len(self.events) > 0 and self.events[0][0] == self.now:
+                time_, count_, event, execution = heapq.heappop(self.events)
+                if event == SUBMIT_EVENT:
+                    self.queue.add(execution)
+                else:
+                    self._end(execution)
+                    last_end = self.now
+            self._schedule_pass()
+
+        makespan = last_end - first_submit
+        memory_total = sum(self.cluster.memory_total.values())
+        return {
+            'executions': len(self.waits),
+            'makespan': makespan,
+            'wait_mean': sum(self.waits) / len(self.waits) if len(self.waits) > 0 else 0,
+            'wait_p50': percentile(self.waits, 0.5),
+            'wait_p90': percentile(self.waits, 0.9),
+            'wait_p99': percentile(self.waits, 0.99),
+            'wait_max': max(self.waits) if len(self.waits) > 0 else 0,
+            'utilization': self.used_memory_time / (memory_total * makespan) if makespan > 0 else 0,
+            'slowdown_mean': sum(self.slowdowns) / len(self.slowdowns) if len(self.slowdowns) > 0 else 0,
+            'slowdown_max': max(self.slowdowns) if len(self.slowdowns) > 0 else 0
+        }
+
+    def _push(self, when, event, execution):
+        self.event_count += 1
+        heapq.heappush(self.events, (when, self.event_count, event, execution))
+
+    def _schedule_pass(self):
+        """Same decisions as ZoeScheduler._schedule_pass, with exact knowledge of the cluster status."""
+        placement = ZoePlacement(self.cluster.snapshot(), self.args.placement_policy)
+        while len(self.queue) > 0:
+            queue = self.queue.ordered()
+            head = queue[0]
+            if placement.fits(self._memory_list(head)):
+                self._start(head, placement)
+                continue
+            if self.use_backfill:
+                self._backfill(head, queue[1:], placement)
+            break
+
+    def _backfill(self, head, candidates, placement):
+        running = []
+        for execution, reservations in self.running.values():
+            runtime = self.estimator.estimate(execution)
+            end = backfill.NEVER if runtime is None else execution.time_start.timestamp() + runtime
+            running.append((end, sum([memory for node_, memory in reservations])))
+        shadow, extra_memory = backfill.shadow_time(sum(placement.free_memory.values()), sum(self._memory_list(head)), running)
+        for e in candidates:
+            memory_list = self._memory_list(e)
+            if not placement.fits(memory_list):
+                continue
+            allowed, extra_memory = backfill.can_backfill(self.now, self.estimator.estimate(e), sum(memory_list), shadow, extra_memory)
+            if allowed:
+                self._start(e, placement)
+
+    def _start(self, execution, placement):
+        self.queue.remove(execution)
+        execution.time_start = datetime.datetime.fromtimestamp(self.now)
+        reservations = []
+        for memory in self._memory_list(execution):
+            node = placement.choose_node(memory, execution.id)
+            self.cluster.memory_reserved[node] += memory
+            reservations.append((node, memory))
+        self.running[execution.id] = (execution, reservations)
+        self.queue.account(execution, sum([memory for node_, memory in reservations]))
+
+        runtime = self.estimator.runtimes[execution.id]
+        wait = self.now - execution.time_submit.timestamp()
+        self.waits.append(wait)
+        self.slowdowns.append(max(1, (wait + runtime) / max(runtime, SLOWDOWN_THRESHOLD)))
+        self._push(self.now + runtime, END_EVENT, execution)
+
+    def _end(self, execution):
+        execution_, reservations = self.running.pop(execution.id)
+        runtime = self.now - execution.time_start.timestamp()
+        for node, memory in reservations:
+            self.cluster.memory_reserved[node] -= memory
+            self.used_memory_time += memory * runtime
+        self.queue.account(execution, -sum([memory for node_, memory in reservations]))
+        self.estimator.record(runtime)
+
+    @staticmethod
+    def _memory_list(execution):
+        memory_list = []
+        for service_descr in execution.description['services']:
+            memory_list += [service_descr['required_resources']['memory']] * service_descr['essential_count']
+        return memory_list
+
+
+def process_arguments():
+    """Parse the command line."""
+    argparser = argparse.ArgumentParser(description='Zoe scheduler simulator')
+    argparser.add_argument('trace', help='CSV trace file, as produced by boinc_trace.py')
+    argparser.add_argument('--policies', default='FIFO,SIZE,FAIR', help='Comma separated list of policies to compare')
+    argparser.add_argument('--backfill', action='store_true', help='Also evaluate each policy with EASY backfilling')
+    argparser.add_argument('--nodes', type=int, default=10, help='Number of nodes in the simulated cluster')
+    argparser.add_argument('--node-memory', type=float, default=64, help='Memory of each node, in GiB')
+    argparser.add_argument('--default-memory', type=float, default=4, help='Memory reserved by executions with no memory usage in the trace, in GiB')
+    argparser.add_argument('--placement-policy', choices=['swarm', 'binpack', 'spread'], default='binpack', help='Node choice for services')
+    argparser.add_argument('--size-aging-time', type=int, default=3600, help='Aging time for the SIZE policy')
+    argparser.add_argument('--fair-share-weights', default='', help='User shares for the FAIR policy')
+    argparser.add_argument('--oracle', action='store_true', help='Give the policies the exact run times from the trace instead of estimates from past executions')
+    return argparser.parse_args()
+
+
+def main():
+    """Main."""
+    args = process_arguments()
+    jobs = load_trace(args.trace, int(args.default_memory * GB))
+    print('{} executions loaded from {}'.format(len(jobs), args.trace))
+
+    print('{:<14} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10} {:>7} {:>9} {:>9}'.format('policy', 'makespan', 'wait avg', 'wait p50', 'wait p90', 'wait p99', 'wait max', 'util', 'sd avg', 'sd max'))
+    for policy_name in args.policies.split(','):
+        for use_backfill in ([False, True] if args.backfill else [False]):
+            results = Simulator(jobs, args, policy_name.strip(), use_backfill).run()
+            label = policy_name.strip() + ('+backfill' if use_backfill else '')
+            print('{:<14} {makespan:>10.0f} {wait_mean:>10.1f} {wait_p50:>10.1f} {wait_p90:>10.1f} {wait_p99:>10.1f} {wait_max:>10.1f} {utilization:>7.1%} {slowdown_mean:>9.2f} {slowdown_max:>9.2f}'.format(label, **results))
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,6 @@
 
 """Bypass the Zoe scheduler to run a ZApp and leave the logs inside Docker, used for debugging ZApps."""
 
-import datetime
 import json
 import logging
 import time
@@ -25,10 +24,10 @@ import time
 import zoe_lib.applications
 import zoe_lib.config as config
 from zoe_lib.configargparse import ArgumentParser, FileType
-from zoe_lib.sql_manager import Execution, Service
+from zoe_lib.memory_state import MemoryStateManager
 from zoe_lib.swarm_client import SwarmClient
 from zoe_master.execution_manager import _digest_application_description
-from zoe_master.zapp_to_docker import execution_to_containers, terminate_execution
+from zoe_master.zapp_to_docker import execution_to_containers, service_to_container, terminate_execution
 
 log = logging.getLogger("main")
 LOG_FORMAT = '%(asctime)-15s %(levelname)s %(name)s (%(threadName)s): %(message)s'
@@ -39,97 +38,6 @@ CONFIG_PATHS = [
 ]
 
 
-class FakeSQLManager:
-    """A fake in-memory state class."""
-    def __init__(self):
-        self.executions = []
-        self.services = []
-        self._last_id = 0
-
-    def execution_list(self, only_one=False, **kwargs):
-        """Execution list."""
-        ret_list = []
-        for e in self.executions:
-            for key, value in kwargs.items():
-                if getattr(e, key) == value:
-                    ret_list.append(e)
-        if only_one:
-            return ret_list[0]
-        else:
-            return ret_list
-
-    def execution_update(self, exec_id, **kwargs):
-        """Execution update."""
-        for e in self.executions:
-            if e.id == exec_id:
-                for key, value in kwargs.items():
-                    if key == "status":
-                        continue
-                    print(key, value)
-                    setattr(e, key, value)
-                break
-
-    def execution_new(self, name, user_id, description):
-        """New execution."""
-        e_dict = {
-            'id': self._last_id,
-            'name': name,
-            'user_id': user_id,
-            'description': description,
-            'status': Execution.SUBMIT_STATUS,
-            'time_submit': datetime.datetime.now(),
-            'time_start': None,
-            'time_end': None,
-            'error_message': None
-        }
-        e = Execution(e_dict, self)
-        self.executions.append(e)
-        self._last_id += 1
-        return self._last_id - 1
-
-    def execution_delete(self, execution_id):
-        """Delete execution."""
-        raise NotImplementedError
-
-    def service_list(self, only_one=False, **kwargs):
-        """Service list."""
-        ret_list = []
-        for e in self.services:
-            for key, value in kwargs.items():
-                if getattr(e, key) == value:
-                    ret_list.append(e)
-        if only_one:
-            return ret_list[0]
-        else:
-            return ret_list
-
-    def service_update(self, service_id, **kwargs):
-        """Service update."""
-        for e in self.services:
-            if e.id == service_id:
-                for key, value in kwargs.items():
-                    setattr(e, key, value)
-                break
-
-    def service_new(self, execution_id, name, service_group, description):
-        """Service new."""
-        s_dict = {
-            'id': self._last_id,
-            'name': name,
-            'description': description,
-            'status': Execution.SUBMIT_STATUS,
-            'execution_id': execution_id,
-            'docker_id': None,
-            'service_group': service_group,
-            'error_message': None,
-            'docker_status': Service.DOCKER_UNDEFINED_STATUS
-        }
-        service = Service(s_dict, self)
-        self.services.append(service)
-        self._last_id += 1
-        return self._last_id - 1
-
-
 def load_configuration():
     """Load configuration from the command line."""
     argparser = ArgumentParser(description="Zoe application tester - Container Analytics as a Service core component",
@@ -203,7 +111,7 @@ def main():
     logging.getLogger('docker').setLevel(logging.INFO)
     logging.getLogger("tornado").setLevel(logging.DEBUG)
 
-    state = FakeSQLManager()
+    state = MemoryStateManager()
 
     zapp_description = json.load(args.jsonfile)
 
@@ -216,6 +124,9 @@ def main():
 
     print('Zapp digested, starting containers...')
     execution_to_containers(e)
+    for service in e.services:
+        if not service.essential:
+            service_to_container(e, service)
 
     print('Giving the containers a few seconds to start...')
     time.sleep(5)
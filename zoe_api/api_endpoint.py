@@ -22,6 +22,7 @@ from zoe_lib.config import get_conf
 import zoe_lib.sql_manager
 import zoe_lib.applications
 import zoe_lib.exceptions
+import zoe_lib.profiling
 from zoe_lib.swarm_client import SwarmClient
 
 import zoe_api.master_api
@@ -145,9 +146,53 @@ class APIEndpoint:
         if success:
             return message
 
+    def statistics_swarm(self, uid_, role_):
+        """Retrieve the Swarm status cached by the master."""
+        success, message = self.master.swarm_statistics()
+        if success:
+            return message
+        else:
+            raise zoe_api.exceptions.ZoeException(message)
+
+    def profile_start(self, uid_, role, process, duration):
+        """Start profiling the master or the API process for some seconds, only for admins."""
+        if role != 'admin':
+            raise zoe_api.exceptions.ZoeAuthException()
+        if process == 'master':
+            success, message = self.master.profile_start(duration)
+            if not success:
+                raise zoe_api.exceptions.ZoeException(message)
+        elif not zoe_lib.profiling.profile_start(duration):
+            raise zoe_api.exceptions.ZoeException('A profile is already running')
+
+    def profile_result(self, uid_, role, process):
+        """Retrieve the results of the last profile of the master or the API process, only for admins."""
+        if role != 'admin':
+            raise zoe_api.exceptions.ZoeAuthException()
+        if process == 'master':
+            success, message = self.master.profile_result()
+            if not success:
+                raise zoe_api.exceptions.ZoeNotFoundException(message)
+            return message
+        result = zoe_lib.profiling.profile_result()
+        if result is None:
+            raise zoe_api.exceptions.ZoeNotFoundException('No profile has been started')
+        return result
+
+    def thread_stacks(self, uid_, role, process):
+        """Retrieve the current stack of all the threads of the master or the API process, only for admins."""
+        if role != 'admin':
+            raise zoe_api.exceptions.ZoeAuthException()
+        if process == 'master':
+            success, message = self.master.thread_stacks()
+            if not success:
+                raise zoe_api.exceptions.ZoeException(message)
+            return message
+        return zoe_lib.profiling.thread_stacks()
+
     def retry_submit_error_executions(self):
         """Resubmit any execution forgotten by the master."""
-        waiting_execs = self.sql.execution_list(status=zoe_lib.sql_manager.Execution.SUBMIT_STATUS)
+        waiting_execs = self.sql.execution_list(fields=['status'], status=zoe_lib.sql_manager.Execution.SUBMIT_STATUS)
         if waiting_execs is None or len(waiting_execs) == 0:
             return
         e = waiting_execs[0]
@@ -158,12 +203,12 @@ class APIEndpoint:
     def cleanup_dead_executions(self):
         """Terminates all executions with dead "monitor" services."""
         log.debug('Starting dead execution cleanup task')
-        all_execs = self.sql.execution_list()
-        for execution in all_execs:
-            if execution.status == execution.RUNNING_STATUS:
-                for service in execution.services:
-                    if service.description['monitor'] and service.docker_status == service.DOCKER_DIE_STATUS:
-                        log.info("Service {} of execution {} died, terminating execution".format(service.name, execution.id))
-                        self.master.execution_terminate(execution.id)
-                        break
+        running_execs = self.sql.execution_list(fields=['status'], status=zoe_lib.sql_manager.Execution.RUNNING_STATUS)
+        for execution in running_execs:
+            services = self.sql.service_list(fields=['name', 'execution_id', 'service_group', 'docker_status'], execution_id=execution.id)
+            for service in services:
+                if service.description['monitor'] and service.docker_status == service.DOCKER_DIE_STATUS:
+                    log.info("Service {} of execution {} died, terminating execution".format(service.name, execution.id))
+                    self.master.execution_terminate(execution.id)
+                    break
         log.debug('Cleanup task finished')
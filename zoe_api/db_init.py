@@ -21,7 +21,7 @@ import psycopg2.extras
 import zoe_api.exceptions
 from zoe_lib.config import get_conf
 
-SQL_SCHEMA_VERSION = 1  # ---> Increment this value every time the schema changes !!! <---
+SQL_SCHEMA_VERSION = 3  # ---> Increment this value every time the schema changes !!! <---
 
 
 def version_table(cur):
@@ -65,16 +65,22 @@ def create_tables(cur):
         time_end TIMESTAMP NULL,
         error_message TEXT NULL
         )''')
+    cur.execute('''CREATE TABLE service_description (
+        execution_id INT REFERENCES execution,
+        service_group TEXT NOT NULL,
+        description JSON NOT NULL,
+        PRIMARY KEY (execution_id, service_group)
+        )''')
     cur.execute('''CREATE TABLE service (
         id SERIAL PRIMARY KEY,
         status TEXT NOT NULL,
         error_message TEXT NULL DEFAULT NULL,
-        description JSON NOT NULL,
         execution_id INT REFERENCES execution,
         service_group TEXT NOT NULL,
         name TEXT NOT NULL,
         docker_id TEXT NULL DEFAULT NULL,
-        docker_status TEXT NOT NULL DEFAULT 'undefined'
+        docker_status TEXT NOT NULL DEFAULT 'undefined',
+        essential BOOLEAN NOT NULL DEFAULT FALSE
         )''')
 
 
@@ -26,6 +26,7 @@ import zoe_lib.config as config
 import zoe_api.db_init
 import zoe_api.api_endpoint
 import zoe_api.rest_api
+import zoe_api.rest_api.metrics
 import zoe_api.web
 import zoe_api.auth.ldap
 from zoe_api.web.custom_request_handler import JinjaApp
@@ -50,6 +51,10 @@ def zoe_web_main() -> int:
         log.error("LDAP authentication requested, but 'pyldap' module not installed.")
         return 1
 
+    if config.get_conf().state_backend != 'postgres':
+        log.error("The API needs the postgres state backend, the {} backend is private to the master process.".format(config.get_conf().state_backend))
+        return 1
+
     zoe_api.db_init.init()
 
     api_endpoint = zoe_api.api_endpoint.APIEndpoint()
@@ -57,6 +62,7 @@ def zoe_web_main() -> int:
     app_settings = {
         'static_path': os.path.join(os.path.dirname(__file__), "web", "static"),
         'template_path': os.path.join(os.path.dirname(__file__), "web", "templates"),
+        'log_function': zoe_api.rest_api.metrics.log_request,
         # 'debug': args.debug
     }
     app = Application(zoe_api.web.web_init(api_endpoint) + zoe_api.rest_api.api_init(api_endpoint), **app_settings)
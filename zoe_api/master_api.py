@@ -16,11 +16,14 @@
 """The client side of the ZeroMQ API."""
 
 import logging
+import time
 from typing import Dict, Any, Tuple
 
 import zmq
 
 import zoe_lib.config as config
+from zoe_lib.metrics.registry import get_registry
+from zoe_lib.tracing import current_trace_id, span
 
 log = logging.getLogger(__name__)
 
@@ -57,12 +60,17 @@ class APIManager:
         Implements the Lazy Pirate Pattern for a reliable client communication.
         """
         self._connect()  # Make sure we are connected
+        if current_trace_id() is not None:
+            message['trace_id'] = current_trace_id()
         retries_left = self.REQUEST_RETRIES
         while retries_left:
-            self.zmq_s.send_json(message)  # send the message
-            socks = dict(self.poll.poll(self.REQUEST_TIMEOUT))
+            time_start = time.time()
+            with span('zmq ' + message['command']):
+                self.zmq_s.send_json(message)  # send the message
+                socks = dict(self.poll.poll(self.REQUEST_TIMEOUT))
             if socks.get(self.zmq_s) == zmq.POLLIN:  # We have a reply
                 reply = self.zmq_s.recv_json()
+                get_registry().histogram('master_request_seconds', command=message['command']).observe(time.time() - time_start)
                 if reply['result'] == 'ok':
                     return True, '' if 'data' not in reply else reply['data']
                 else:
@@ -107,3 +115,32 @@ class APIManager:
             'command': 'scheduler_stats'
         }
         return self._request_reply(msg)
+
+    def swarm_statistics(self) -> APIReturnType:
+        """Query the Swarm status cached by the master."""
+        msg = {
+            'command': 'swarm_stats'
+        }
+        return self._request_reply(msg)
+
+    def profile_start(self, duration: float) -> APIReturnType:
+        """Start profiling the master for some seconds."""
+        msg = {
+            'command': 'profile_start',
+            'duration': duration
+        }
+        return self._request_reply(msg)
+
+    def profile_result(self) -> APIReturnType:
+        """Retrieve the results of the last profile of the master."""
+        msg = {
+            'command': 'profile_result'
+        }
+        return self._request_reply(msg)
+
+    def thread_stacks(self) -> APIReturnType:
+        """Retrieve the current stack of all the threads of the master."""
+        msg = {
+            'command': 'thread_stacks'
+        }
+        return self._request_reply(msg)
@@ -21,9 +21,11 @@ import tornado.web
 
 from zoe_api.rest_api.execution import ExecutionAPI, ExecutionCollectionAPI, ExecutionDeleteAPI
 from zoe_api.rest_api.info import InfoAPI
+from zoe_api.rest_api.metrics import MetricsAPI
+from zoe_api.rest_api.profiling import ProfileAPI, ThreadStacksAPI
 from zoe_api.rest_api.service import ServiceAPI, ServiceLogsAPI
 from zoe_api.rest_api.discovery import DiscoveryAPI
-from zoe_api.rest_api.statistics import SchedulerStatsAPI
+from zoe_api.rest_api.statistics import SchedulerStatsAPI, SwarmStatsAPI
 
 from zoe_lib.version import ZOE_API_VERSION
 
@@ -48,7 +50,13 @@ def api_init(api_endpoint) -> List[tornado.web.URLSpec]:
 
         tornado.web.url(API_PATH + r'/discovery/by_group/([0-9]+)/([a-z0-9A-Z\-]+)', DiscoveryAPI, route_args),
 
-        tornado.web.url(API_PATH + r'/statistics/scheduler', SchedulerStatsAPI, route_args)
+        tornado.web.url(API_PATH + r'/statistics/scheduler', SchedulerStatsAPI, route_args),
+        tornado.web.url(API_PATH + r'/statistics/swarm', SwarmStatsAPI, route_args),
+
+        tornado.web.url(API_PATH + r'/profile/(master|api)', ProfileAPI, route_args),
+        tornado.web.url(API_PATH + r'/profile/(master|api)/stacks', ThreadStacksAPI, route_args),
+
+        tornado.web.url(r'/metrics', MetricsAPI)
     ]
 
     return api_routes
@@ -0,0 +1,56 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The Prometheus metrics endpoint."""
+
+import logging
+
+from tornado.web import RequestHandler
+
+from zoe_lib.metrics.prometheus import format_registry, CONTENT_TYPE
+from zoe_lib.metrics.registry import get_registry
+
+access_log = logging.getLogger("tornado.access")
+
+
+def log_request(handler: RequestHandler):
+    """Tornado log_function: records the latency of each HTTP request in the registry, then logs it like Tornado does."""
+    request_time = handler.request.request_time()
+    get_registry().histogram('http_request_seconds', handler=type(handler).__name__, method=handler.request.method).observe(request_time)
+
+    if handler.get_status() < 400:
+        log_method = access_log.info
+    elif handler.get_status() < 500:
+        log_method = access_log.warning
+    else:
+        log_method = access_log.error
+    log_method("%d %s %s (%s) %.2fms", handler.get_status(), handler.request.method, handler.request.uri, handler.request.remote_ip, 1000.0 * request_time)
+
+
+class MetricsAPI(RequestHandler):
+    """The metrics of the API process, in the Prometheus text format."""
+
+    def initialize(self, **kwargs):
+        """Initializes the request handler."""
+        pass
+
+    def get(self):
+        """HTTP GET method."""
+        self.set_header('Content-Type', CONTENT_TYPE)
+        self.write(format_registry())
+
+    def data_received(self, chunk):
+        """Not implemented as we do not use stream uploads"""
+        pass
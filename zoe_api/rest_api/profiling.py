@@ -0,0 +1,75 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The Profiling API endpoints, for admins."""
+
+from tornado.web import RequestHandler
+import tornado.escape
+
+from zoe_api.rest_api.utils import catch_exceptions, get_auth
+import zoe_api.exceptions
+from zoe_api.api_endpoint import APIEndpoint  # pylint: disable=unused-import
+
+
+class ProfileAPI(RequestHandler):
+    """The Profile API endpoint, process is either master or api."""
+
+    def initialize(self, **kwargs):
+        """Initializes the request handler."""
+        self.api_endpoint = kwargs['api_endpoint']  # type: APIEndpoint
+
+    @catch_exceptions
+    def get(self, process):
+        """Returns the results of the last profile, also while it is running."""
+        uid, role = get_auth(self)
+
+        self.write(self.api_endpoint.profile_result(uid, role, process))
+
+    @catch_exceptions
+    def post(self, process):
+        """Starts a profile. Takes a JSON object with the duration in seconds (default 10)."""
+        uid, role = get_auth(self)
+
+        try:
+            data = tornado.escape.json_decode(self.request.body) if len(self.request.body) > 0 else {}
+            duration = float(data.get('duration', 10))
+        except (ValueError, AttributeError):
+            raise zoe_api.exceptions.ZoeRestAPIException('Error decoding JSON data')
+
+        self.api_endpoint.profile_start(uid, role, process, duration)
+        self.set_status(202)
+
+    def data_received(self, chunk):
+        """Not implemented as we do not use stream uploads"""
+        pass
+
+
+class ThreadStacksAPI(RequestHandler):
+    """The Thread Stacks API endpoint, process is either master or api."""
+
+    def initialize(self, **kwargs):
+        """Initializes the request handler."""
+        self.api_endpoint = kwargs['api_endpoint']  # type: APIEndpoint
+
+    @catch_exceptions
+    def get(self, process):
+        """Returns the current stack of every thread."""
+        uid, role = get_auth(self)
+
+        self.write(self.api_endpoint.thread_stacks(uid, role, process))
+
+    def data_received(self, chunk):
+        """Not implemented as we do not use stream uploads"""
+        pass
@@ -13,7 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""The Scheduler Statistics API endpoint."""
+"""The Statistics API endpoints."""
 
 from tornado.web import RequestHandler
 
@@ -37,3 +37,21 @@ class SchedulerStatsAPI(RequestHandler):
     def data_received(self, chunk):
         """Not implemented as we do not use stream uploads"""
         pass
+
+
+class SwarmStatsAPI(RequestHandler):
+    """The Swarm Statistics API endpoint."""
+
+    def initialize(self, **kwargs):
+        """Initializes the request handler."""
+        self.api_endpoint = kwargs['api_endpoint']  # type: APIEndpoint
+
+    @catch_exceptions
+    def get(self):
+        """HTTP GET method."""
+        statistics = self.api_endpoint.statistics_swarm(0, 'guest')
+        self.write(statistics)
+
+    def data_received(self, chunk):
+        """Not implemented as we do not use stream uploads"""
+        pass
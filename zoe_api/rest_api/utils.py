@@ -21,6 +21,8 @@ import logging
 import tornado.web
 
 from zoe_lib.config import get_conf
+from zoe_lib.sql_manager import query_stats
+from zoe_lib.tracing import new_trace_id, span, trace_context
 
 from zoe_api.exceptions import ZoeRestAPIException, ZoeNotFoundException, ZoeAuthException, ZoeException
 from zoe_api.auth.ldap import LDAPAuthenticator
@@ -34,32 +36,37 @@ log = logging.getLogger(__name__)
 def catch_exceptions(func):
     """
     Decorator function used to work around the static exception system available in Flask-RESTful
+
+    Each request also gets a new trace ID, returned to the client in the X-Zoe-Trace-Id header.
     :param func:
     :return:
     """
     def func_wrapper(*args, **kwargs):
         """The actual decorator."""
         self = args[0]
-        try:
-            return func(*args, **kwargs)
-        except ZoeRestAPIException as e:
-            if e.status_code != 401:
-                log.exception(e.message)
-            self.set_status(e.status_code)
-            self.write({'message': e.message})
-        except ZoeNotFoundException as e:
-            self.set_status(404)
-            self.write({'message': e.message})
-        except ZoeAuthException as e:
-            self.set_status(401)
-            self.write({'message': e.message})
-        except ZoeException as e:
-            self.set_status(400)
-            self.write({'message': e.message})
-        except Exception as e:
-            self.set_status(500)
-            log.exception(str(e))
-            self.write({'message': str(e)})
+        request_name = 'rest {} {}'.format(type(self).__name__, func.__name__)
+        with trace_context(new_trace_id()) as trace_id, span(request_name), query_stats(request_name):
+            self.set_header('X-Zoe-Trace-Id', trace_id)
+            try:
+                return func(*args, **kwargs)
+            except ZoeRestAPIException as e:
+                if e.status_code != 401:
+                    log.exception(e.message)
+                self.set_status(e.status_code)
+                self.write({'message': e.message})
+            except ZoeNotFoundException as e:
+                self.set_status(404)
+                self.write({'message': e.message})
+            except ZoeAuthException as e:
+                self.set_status(401)
+                self.write({'message': e.message})
+            except ZoeException as e:
+                self.set_status(400)
+                self.write({'message': e.message})
+            except Exception as e:
+                self.set_status(500)
+                log.exception(str(e))
+                self.write({'message': str(e)})
 
     return func_wrapper
 
@@ -22,6 +22,7 @@ import json
 import logging
 import os
 import sys
+import time
 from argparse import ArgumentParser, Namespace, FileType, RawDescriptionHelpFormatter
 from typing import Tuple
 
@@ -150,6 +151,42 @@ def stats_cmd(args_):
     sched = stats_api.scheduler()
     print('Scheduler queue length: {}'.format(sched['queue_length']))
     print('Termination threads count: {}'.format(sched['termination_threads_count']))
+    print('Elastic services waiting for resources: {}'.format(sched['elastic_pending_count']))
+    swarm = stats_api.swarm()
+    print('Swarm status at {}:'.format(datetime.datetime.fromtimestamp(swarm['timestamp'])))
+    print(' - containers: {}'.format(swarm['container_count']))
+    print(' - memory: {} total'.format(swarm['memory_total']))
+    print(' - cores: {} total'.format(swarm['cores_total']))
+    for node in swarm['nodes']:
+        print(' - node {}: {} containers, memory {} / {}, cores {} / {}'.format(node['name'], node['container_count'], node['memory_reserved'], node['memory_total'], node['cores_reserved'], node['cores_total']))
+
+def profile_cmd(args):
+    """Profiles the master or the api process and prints the functions where most time is spent."""
+    stats_api = ZoeStatisticsAPI(utils.zoe_url(), utils.zoe_user(), utils.zoe_pass())
+    stats_api.profile_start(args.process, args.duration)
+    print('Profiling the {} process for {} seconds...'.format(args.process, args.duration))
+    time.sleep(args.duration + 1)
+    profile = stats_api.profile_result(args.process)
+    while profile['status'] == 'running':
+        time.sleep(1)
+        profile = stats_api.profile_result(args.process)
+    print('{} samples, one every {} seconds'.format(profile['samples'], profile['interval']))
+    print('{:>8} {:>8}  {}'.format('self', 'total', 'function'))
+    for entry in profile['functions'][:args.top]:
+        print('{:>8} {:>8}  {}'.format(entry['self'], entry['total'], entry['function']))
+    if args.stacks is not None:
+        args.stacks.write('\n'.join(profile['stacks']) + '\n')
+
+
+def stacks_cmd(args):
+    """Prints the current stack of all the threads of the master or the api process."""
+    stats_api = ZoeStatisticsAPI(utils.zoe_url(), utils.zoe_user(), utils.zoe_pass())
+    stacks = stats_api.thread_stacks(args.process)
+    for thread in sorted(stacks):
+        print('Thread {}:'.format(thread))
+        for line in stacks[thread]:
+            print(line)
+        print()
 
 ENV_HELP_TEXT = '''To use this tool you need also to define three environment variables:
 ZOE_URL: point to the URL of the Zoe Scheduler (ex.: http://localhost:5000/
@@ -203,6 +240,17 @@ def process_arguments() -> Tuple[ArgumentParser, Namespace]:
     argparser_stats = subparser.add_parser('stats', help="Prints all available statistics")
     argparser_stats.set_defaults(func=stats_cmd)
 
+    argparser_profile = subparser.add_parser('profile', help="Profiles a Zoe process for some seconds (admin only)")
+    argparser_profile.add_argument('process', choices=['master', 'api'], help="Process to profile")
+    argparser_profile.add_argument('--duration', type=float, default=10, help="Seconds of profiling")
+    argparser_profile.add_argument('--top', type=int, default=20, help="Number of functions to print")
+    argparser_profile.add_argument('--stacks', type=FileType("w"), help='Also save the sampled stacks to this file, in the collapsed format used by flame graph tools')
+    argparser_profile.set_defaults(func=profile_cmd)
+
+    argparser_stacks = subparser.add_parser('stacks', help="Prints the stack of all the threads of a Zoe process (admin only)")
+    argparser_stacks.add_argument('process', choices=['master', 'api'], help="Process to inspect")
+    argparser_stacks.set_defaults(func=stacks_cmd)
+
     return parser, parser.parse_args()
 
 
@@ -49,23 +49,45 @@ def load_configuration(test_conf=None):
 
         # Common options
         argparser.add_argument('--debug', action='store_true', help='Enable debug output')
-        argparser.add_argument('--swarm', help='Swarm/Docker API endpoint (ex.: zk://zk1:2181,zk2:2181 or http://swarm:2380)', default='http://localhost:2375')
+        argparser.add_argument('--swarm', help='Swarm/Docker API endpoint (ex.: zk://zk1:2181,zk2:2181 or http://swarm:2380, fake://?nodes=4 for a simulated cluster)', default='http://localhost:2375')
         argparser.add_argument('--deployment-name', help='name of this Zoe deployment', default='prod')
+        argparser.add_argument('--trace-output', help='Where to record the spans of traced requests: a file name, "metrics" for the metrics output of the master, empty to disable tracing', default='')
 
+        argparser.add_argument('--state-backend', choices=['postgres', 'memory'], help='Where the state is kept: in PostgreSQL or in the memory of the master process (only for tests and benchmarks of the master)', default='postgres')
         argparser.add_argument('--dbname', help='DB name', default='zoe')
         argparser.add_argument('--dbuser', help='DB user', default='zoe')
         argparser.add_argument('--dbpass', help='DB password', default='')
         argparser.add_argument('--dbhost', help='DB hostname', default='localhost')
         argparser.add_argument('--dbport', type=int, help='DB port', default=5432)
+        argparser.add_argument('--db-slow-query-threshold', type=float, help='Queries taking longer than this many seconds are logged, 0 to disable', default=0.5)
 
         # Master options
         argparser.add_argument('--api-listen-uri', help='ZMQ API listen address', default='tcp://*:4850')
         argparser.add_argument('--influxdb-dbname', help='Name of the InfluxDB database to use for storing metrics', default='zoe')
         argparser.add_argument('--influxdb-url', help='URL of the InfluxDB service (ex. http://localhost:8086)', default='http://localhost:8086')
         argparser.add_argument('--influxdb-enable', action="store_true", help='Enable metric output toward influxDB')
+        argparser.add_argument('--metrics-flush-interval', type=int, help='Seconds between two reports of the counters, gauges and histograms kept by the master', default=10)
+        argparser.add_argument('--metrics-batch-size', type=int, help='Maximum number of metric points sent in a single write', default=500)
+        argparser.add_argument('--metrics-batch-timeout', type=float, help='Maximum seconds a metric point waits to be sent together with others', default=5)
+        argparser.add_argument('--metrics-queue-size', type=int, help='Maximum number of metric points waiting to be sent, further points are dropped', default=10000)
+        argparser.add_argument('--influxdb-spill-file', help='File where metric points are saved while InfluxDB is unreachable, to be sent later', default='')
+        argparser.add_argument('--metrics-listen-port', type=int, help='Port where the master serves its metrics in the Prometheus text format on /metrics, 0 to disable', default=0)
+        argparser.add_argument('--metrics-listen-address', help='Address where the master serves its metrics in the Prometheus text format', default='0.0.0.0')
         argparser.add_argument('--gelf-address', help='Enable Docker GELF log output to this destination (ex. udp://1.2.3.4:1234)', default='')
         argparser.add_argument('--workspace-base-path', help='Path where user workspaces will be created by Zoe. Must be visible at this path on all Swarm hosts.', default='/mnt/zoe-workspaces')
         argparser.add_argument('--overlay-network-name', help='Name of the Swarm overlay network Zoe should use', default='zoe')
+        argparser.add_argument('--scheduler-policy', choices=['FIFO', 'SIZE', 'FAIR'], help='Order in which queued executions are started: arrival order (FIFO), smallest expected size first (SIZE) or per-user fair share (FAIR)', default='FIFO')
+        argparser.add_argument('--size-aging-time', type=int, help='For the SIZE policy, seconds of waiting after which the size of an execution counts half, 0 disables aging', default=3600)
+        argparser.add_argument('--fair-share-weights', help='For the FAIR policy, share of each user in the form user1:2,user2:0.5 (default share is 1)', default='')
+        argparser.add_argument('--preemption-threshold', type=int, help='Running executions with a priority lower than this can be terminated and queued again to make room for executions with a higher priority, 0 disables preemption', default=0)
+        argparser.add_argument('--start-retry-delay', type=float, help='Seconds to wait before retrying an execution that failed to start for a temporary reason, doubled at each failure', default=5)
+        argparser.add_argument('--start-retry-max-delay', type=float, help='Maximum delay in seconds between two start attempts of the same execution', default=300)
+        argparser.add_argument('--start-retry-budget', type=int, help='Number of times an execution that failed to start is retried before giving up', default=10)
+        argparser.add_argument('--backfill', action='store_true', help='Let executions jump ahead of a queue head that waits for resources, as long as they do not delay it (EASY backfilling)')
+        argparser.add_argument('--placement-policy', choices=['swarm', 'binpack', 'spread'], help='How to choose the node for each service: leave it to the Swarm strategy, or let Zoe pack services on the fullest nodes (binpack) or on the emptiest ones (spread)', default='swarm')
+        argparser.add_argument('--cluster-state-interval', type=int, help='Seconds between refreshes of the cached Swarm status, container events also cause a refresh', default=30)
+        argparser.add_argument('--orphan-gc-interval', type=int, help='Seconds between checks for orphan Zoe containers in Swarm, 0 to disable', default=300)
+        argparser.add_argument('--orphan-gc-dry-run', action='store_true', help='Only log orphan Zoe containers, do not remove them')
 
         # API options
         argparser.add_argument('--listen-address', type=str, help='Address to listen to for incoming connections', default="0.0.0.0")
@@ -0,0 +1,302 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+In-process simulation of a Docker Swarm cluster, for load tests without Docker.
+
+It is selected with a swarm URL in the form fake://?nodes=4&node_memory=64GiB&latency=0.05, the parameters are:
+
+* nodes: number of simulated nodes (default 4)
+* node_memory: memory of each node (default 64GiB)
+* node_cores: cores of each node (default 16)
+* latency: seconds spent in each API call (default 0)
+* failure_rate: probability that a container creation fails (default 0)
+* lifetime: seconds after which started containers exit on their own, 0 to run until killed (default 0)
+"""
+
+import hashlib
+import itertools
+import logging
+import queue
+import random
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+import docker.errors
+import docker.utils
+import humanfriendly
+import requests
+
+log = logging.getLogger(__name__)
+
+_FAKE_CLIENTS = {}
+_FAKE_CLIENTS_LOCK = threading.Lock()
+
+
+def get_fake_docker_client(url: str) -> 'FakeDockerClient':
+    """Return the simulated cluster for this URL, there is only one per process so that all SwarmClient objects share it."""
+    with _FAKE_CLIENTS_LOCK:
+        if url not in _FAKE_CLIENTS:
+            _FAKE_CLIENTS[url] = FakeDockerClient(url)
+        return _FAKE_CLIENTS[url]
+
+
+def _api_error(status_code: int, reason: str, exception_class=docker.errors.APIError):
+    """Build the exception raised by docker-py for an HTTP error."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = reason
+    response._content = reason.encode('utf-8')  # pylint: disable=protected-access
+    return exception_class(reason, response)
+
+
+class FakeDockerClient:
+    """Implements the subset of the docker.Client API used by SwarmClient, returning data in the same format as Swarm."""
+    def __init__(self, url: str) -> None:
+        params = parse_qs(urlparse(url).query)
+
+        def param(name, default):
+            """Read a parameter from the URL."""
+            return params[name][0] if name in params else default
+
+        self.latency = float(param('latency', 0))
+        self.failure_rate = float(param('failure_rate', 0))
+        self.lifetime = float(param('lifetime', 0))
+        node_memory = humanfriendly.parse_size(param('node_memory', '64GiB'))
+        node_cores = int(param('node_cores', 16))
+        self.nodes = {}
+        for idx in range(int(param('nodes', 4))):
+            name = 'fake{}'.format(idx)
+            self.nodes[name] = {'memory': node_memory, 'cores': node_cores, 'address': '10.0.0.{}:2375'.format(idx + 1)}
+
+        self.container_table = {}
+        self.lock = threading.Lock()
+        self.listeners = []
+        self.id_counter = itertools.count()
+        self.ip_counter = itertools.count(2)
+        log.info('Using a simulated Swarm with {} nodes'.format(len(self.nodes)))
+
+    def _delay(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def _get(self, container):
+        if isinstance(container, dict):
+            container = container['Id']
+        for cont in self.container_table.values():
+            if cont['Id'] == container or cont['Name'] == container:
+                return cont
+        raise _api_error(404, 'No such container: {}'.format(container), docker.errors.NotFound)
+
+    def _emit(self, cont, action):
+        event = {
+            'Type': 'container',
+            'Action': action,
+            'status': action,
+            'id': cont['Id'],
+            'node': {'Name': cont['Node'], 'Addr': self.nodes[cont['Node']]['address']},
+            'Actor': {
+                'ID': cont['Id'],
+                'Attributes': dict(cont['Labels'], name=cont['Name'], image=cont['Image'], **{'node.name': cont['Node']})
+            },
+            'time': int(time.time()),
+            'timeNano': int(time.time() * 1e9)
+        }
+        for listener in self.listeners:
+            listener.put(event)
+
+    def _reserved(self, node):
+        return sum([c['Memory'] for c in self.container_table.values() if c['Node'] == node])
+
+    def info(self):
+        """Cluster status, with the Swarm classic DriverStatus format."""
+        self._delay()
+        with self.lock:
+            driver_status = [
+                ['Role', 'primary'],
+                ['Strategy', 'spread'],
+                ['Filters', 'health, port, containerslots, dependency, affinity, constraint'],
+                ['Nodes', str(len(self.nodes))]
+            ]
+            for name in sorted(self.nodes):
+                node = self.nodes[name]
+                driver_status += [
+                    [name, node['address']],
+                    ['  └ Status', 'Healthy'],
+                    ['  └ Containers', str(len([c for c in self.container_table.values() if c['Node'] == name]))],
+                    ['  └ Reserved CPUs', '0 / {}'.format(node['cores'])],
+                    ['  └ Reserved Memory', '{} / {}'.format(humanfriendly.format_size(self._reserved(name), binary=True), humanfriendly.format_size(node['memory'], binary=True))],
+                    ['  └ Labels', 'executiondriver=, kernelversion=fake, operatingsystem=fake, storagedriver=fake'],
+                    ['  └ Error', '(none)'],
+                    ['  └ UpdatedAt', time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())],
+                    ['  └ ServerVersion', '1.12.1']
+                ]
+            return {
+                'Containers': len(self.container_table),
+                'Images': 0,
+                'MemTotal': sum([n['memory'] for n in self.nodes.values()]),
+                'NCPU': sum([n['cores'] for n in self.nodes.values()]),
+                'DriverStatus': driver_status
+            }
+
+    @staticmethod
+    def create_host_config(**kwargs):
+        """Keep the host configuration as given."""
+        return kwargs
+
+    def create_container(self, image, environment=None, host_config=None, name=None, labels=None, ports=None, **kwargs_):
+        """Reserve memory on a node, chosen by constraint or with the spread strategy."""
+        self._delay()
+        if random.random() < self.failure_rate:
+            raise _api_error(500, 'simulated failure creating container {}'.format(name))
+        memory = host_config.get('mem_limit', 0) if host_config is not None else 0
+        if isinstance(memory, str):
+            memory = docker.utils.parse_bytes(memory)
+
+        with self.lock:
+            if name is not None and any(c['Name'] == name for c in self.container_table.values()):
+                raise _api_error(409, 'Conflict: the name {} is already in use'.format(name))
+            candidates = list(self.nodes.keys())
+            for key in (environment or {}):
+                if key.startswith('constraint:node=='):
+                    candidates = [key[len('constraint:node=='):]]
+            candidates = [n for n in candidates if n in self.nodes and self.nodes[n]['memory'] - self._reserved(n) >= memory]
+            if len(candidates) == 0:
+                raise _api_error(500, 'no resources available to schedule container')
+            node = max(candidates, key=lambda n: self.nodes[n]['memory'] - self._reserved(n))
+
+            docker_id = hashlib.sha256('{}-{}'.format(next(self.id_counter), time.time()).encode('utf-8')).hexdigest()
+            cont = {
+                'Id': docker_id,
+                'Name': name if name is not None else docker_id[:12],
+                'Image': image,
+                'Node': node,
+                'Memory': memory,
+                'Labels': dict(labels or {}),
+                'Ports': ports or [],
+                'Networks': {host_config.get('network_mode', 'bridge') if host_config is not None else 'bridge': '10.0.{}.{}'.format(*divmod(next(self.ip_counter), 256))},
+                'Running': False,
+                'Dead': False,
+                'Status': 'Created'
+            }
+            self.container_table[docker_id] = cont
+            self._emit(cont, 'create')
+        return {'Id': docker_id, 'Warnings': None}
+
+    def start(self, container):
+        """Start a created container."""
+        self._delay()
+        with self.lock:
+            cont = self._get(container)
+            cont['Running'] = True
+            cont['Status'] = 'Up'
+            self._emit(cont, 'start')
+        if self.lifetime > 0:
+            threading.Timer(self.lifetime, self._exit, args=(cont['Id'],)).start()
+
+    def _exit(self, docker_id):
+        with self.lock:
+            cont = self.container_table.get(docker_id)
+            if cont is None or not cont['Running']:
+                return
+            cont['Running'] = False
+            cont['Status'] = 'Exited (0)'
+            self._emit(cont, 'die')
+
+    def inspect_container(self, container):
+        """Container details, in the Docker format."""
+        self._delay()
+        with self.lock:
+            cont = self._get(container)
+            return {
+                'Id': cont['Id'],
+                'Name': '/' + cont['Name'],
+                'Node': {'Name': cont['Node'], 'Addr': self.nodes[cont['Node']]['address']},
+                'State': {'Running': cont['Running'], 'Paused': False, 'Restarting': False, 'OOMKilled': False, 'Dead': cont['Dead']},
+                'NetworkSettings': {
+                    'Networks': dict([(net, {'IPAddress': address}) for net, address in cont['Networks'].items()]),
+                    'Ports': dict([(str(port), None) for port in cont['Ports']])
+                }
+            }
+
+    def kill(self, container):
+        """Stop a running container."""
+        self._delay()
+        with self.lock:
+            cont = self._get(container)
+            if cont['Running']:
+                cont['Running'] = False
+                cont['Status'] = 'Exited (137)'
+                self._emit(cont, 'kill')
+                self._emit(cont, 'die')
+
+    def remove_container(self, container, force=False):
+        """Remove a container, killing it if force is True."""
+        self._delay()
+        with self.lock:
+            cont = self._get(container)
+            if cont['Running']:
+                if not force:
+                    raise _api_error(409, 'Conflict: container {} is running'.format(cont['Id']))
+                cont['Running'] = False
+                self._emit(cont, 'kill')
+                self._emit(cont, 'die')
+            del self.container_table[cont['Id']]
+            self._emit(cont, 'destroy')
+
+    def containers(self, all=False):  # pylint: disable=redefined-builtin
+        """List containers, with names in the Swarm /node/name format."""
+        self._delay()
+        with self.lock:
+            return [{
+                'Id': c['Id'],
+                'Names': ['/{}/{}'.format(c['Node'], c['Name'])],
+                'Image': c['Image'],
+                'Labels': c['Labels'],
+                'Status': c['Status']
+            } for c in self.container_table.values() if all or c['Running']]
+
+    def events(self, decode=False):  # pylint: disable=unused-argument
+        """Blocking generator of container events, from the moment it is called."""
+        listener = queue.Queue()
+        self.listeners.append(listener)
+        try:
+            while True:
+                yield listener.get()
+        finally:
+            self.listeners.remove(listener)
+
+    def logs(self, container, stdout=True, stderr=True, stream=False, timestamps=False):  # pylint: disable=unused-argument
+        """Simulated containers produce no output."""
+        self._delay()
+        self._get(container)
+        if stream:
+            return iter([])
+        return b''
+
+    def connect_container_to_network(self, container, net_id):
+        """Give the container an address on another network."""
+        self._delay()
+        with self.lock:
+            cont = self._get(container)
+            cont['Networks'][net_id] = '10.1.{}.{}'.format(*divmod(next(self.ip_counter), 256))
+
+    def disconnect_container_from_network(self, container, net_id):
+        """Remove the container from a network."""
+        self._delay()
+        with self.lock:
+            cont = self._get(container)
+            cont['Networks'].pop(net_id, None)
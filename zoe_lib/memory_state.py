@@ -0,0 +1,218 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-memory Zoe state, with the same interface as the SQLManager."""
+
+import contextlib
+import datetime
+import itertools
+import threading
+
+from zoe_lib.sql_manager import Execution, Service
+
+
+class _Table:
+    """Rows stored as dictionaries, with indexes on some of the columns."""
+    def __init__(self, indexed_columns, int_columns):
+        self.rows = {}
+        self.indexes = dict([(column, {}) for column in indexed_columns])
+        self.int_columns = int_columns  # IDs can be given as strings, like PostgreSQL we convert them
+        self.ids = itertools.count(1)
+
+    def insert(self, row):
+        """Add a row, assigning it a new ID."""
+        row['id'] = next(self.ids)
+        self.rows[row['id']] = row
+        for column, index in self.indexes.items():
+            index.setdefault(row[column], set()).add(row['id'])
+        return row['id']
+
+    def update(self, row_id, values):
+        """Change some columns of a row, if it exists."""
+        row = self.rows.get(int(row_id))
+        if row is None:
+            return
+        for column, value in values.items():
+            if column in self.indexes:
+                self._unindex(column, row)
+                self.indexes[column].setdefault(value, set()).add(row['id'])
+            row[column] = value
+
+    def delete(self, row_id):
+        """Remove a row, if it exists."""
+        row = self.rows.pop(int(row_id), None)
+        if row is None:
+            return
+        for column in self.indexes:
+            self._unindex(column, row)
+
+    def select(self, filters):
+        """Return the rows matching all the filters, using the most selective index available."""
+        filters = dict([(column, int(value) if column in self.int_columns and value is not None else value) for column, value in filters.items()])
+        if 'id' in filters:
+            candidates = [filters['id']]
+        else:
+            candidates = None
+            for column, value in filters.items():
+                if column in self.indexes:
+                    ids = self.indexes[column].get(value, set())
+                    if candidates is None or len(ids) < len(candidates):
+                        candidates = ids
+            if candidates is None:
+                candidates = self.rows.keys()
+        ret = []
+        for row_id in sorted(candidates):
+            row = self.rows.get(row_id)
+            if row is not None and all(row[column] == value for column, value in filters.items()):
+                ret.append(row)
+        return ret
+
+    def _unindex(self, column, row):
+        ids = self.indexes[column].get(row[column])
+        if ids is not None:
+            ids.discard(row['id'])
+            if len(ids) == 0:
+                del self.indexes[column][row[column]]
+
+
+def _project(row, fields):
+    if fields is None:
+        return dict(row)
+    return dict([(column, row[column]) for column in ['id'] + list(fields)])
+
+
+class MemoryStateManager:
+    """
+    Keeps the state in memory, instead of PostgreSQL. Nothing survives a restart.
+
+    Executions are indexed by status and user, services by status and execution. The state is private to the
+    process that creates it, so it can be used to run the master alone, for example for tests and benchmarks,
+    but not with the API, that needs to read the same state from another process.
+    """
+    def __init__(self, conf_=None):
+        self.lock = threading.Lock()
+        self.executions = _Table(['status', 'user_id'], ['id'])
+        self.services = _Table(['status', 'execution_id'], ['id', 'execution_id'])
+        self.descriptions = {}  # (execution id, service group) -> description
+
+    @contextlib.contextmanager
+    def unit_of_work(self):
+        """Changes are applied immediately, there is nothing to group."""
+        yield
+
+    def execution_list(self, only_one=False, fields=None, **kwargs):
+        """
+        Return a list of executions.
+
+        :param only_one: only one result is expected
+        :type only_one: bool
+        :param fields: read only these columns, in addition to the ID, the others are loaded on first access
+        :type fields: list
+        :param kwargs: filter executions based on their fields/columns
+        :return: one or more executions
+        """
+        with self.lock:
+            rows = [_project(row, fields) for row in self.executions.select(kwargs)]
+        if only_one:
+            return Execution(rows[0], self) if len(rows) > 0 else None
+        return [Execution(row, self) for row in rows]
+
+    def execution_update(self, exec_id, **kwargs):
+        """Update the state of an execution."""
+        with self.lock:
+            self.executions.update(exec_id, kwargs)
+
+    def execution_runtime_averages(self):
+        """Return a dictionary with the average run time in seconds of terminated executions, by ZApp name."""
+        runtimes = {}
+        with self.lock:
+            for row in self.executions.select({'status': Execution.TERMINATED_STATUS}):
+                if row['time_start'] is not None and row['time_end'] is not None:
+                    runtimes.setdefault(row['description']['name'], []).append((row['time_end'] - row['time_start']).total_seconds())
+        return dict([(name, sum(values) / len(values)) for name, values in runtimes.items()])
+
+    def execution_new(self, name, user_id, description):
+        """Create a new execution in the state."""
+        with self.lock:
+            return self.executions.insert({
+                'name': name,
+                'user_id': user_id,
+                'description': description,
+                'status': Execution.SUBMIT_STATUS,
+                'execution_manager_id': None,
+                'time_submit': datetime.datetime.now(),
+                'time_start': None,
+                'time_end': None,
+                'error_message': None
+            })
+
+    def execution_delete(self, execution_id):
+        """Delete an execution and its services from the state."""
+        with self.lock:
+            for row in self.services.select({'execution_id': execution_id}):
+                self.services.delete(row['id'])
+                self.descriptions.pop((int(execution_id), row['service_group']), None)
+            self.executions.delete(execution_id)
+
+    def service_list(self, only_one=False, fields=None, **kwargs):
+        """
+        Return a list of services.
+
+        :param only_one: only one result is expected
+        :type only_one: bool
+        :param fields: read only these columns, in addition to the ID, the others are loaded on first access
+        :type fields: list
+        :param kwargs: filter services based on their fields/columns
+        :return: one or more services
+        """
+        with self.lock:
+            rows = [_project(row, fields) for row in self.services.select(kwargs)]
+        if only_one:
+            return Service(rows[0], self) if len(rows) > 0 else None
+        return [Service(row, self) for row in rows]
+
+    def service_docker_ids(self):
+        """Return the set of docker IDs of all the services that have a container in Swarm."""
+        with self.lock:
+            return set([row['docker_id'] for row in self.services.rows.values() if row['docker_id'] is not None])
+
+    def service_update(self, service_id, **kwargs):
+        """Update the state of an existing service."""
+        with self.lock:
+            self.services.update(service_id, kwargs)
+
+    def service_new(self, execution_id, name, service_group, description, is_essential):
+        """Adds a new service to the state."""
+        with self.lock:
+            self.descriptions.setdefault((int(execution_id), service_group), description)
+            return self.services.insert({
+                'status': 'created',
+                'error_message': None,
+                'execution_id': execution_id,
+                'name': name,
+                'service_group': service_group,
+                'docker_id': None,
+                'docker_status': Service.DOCKER_UNDEFINED_STATUS,
+                'essential': is_essential
+            })
+
+    def services_new(self, execution_id, services):
+        """Adds the services of an execution to the state, returns their IDs in the same order."""
+        return [self.service_new(execution_id, name, service_group, description, is_essential) for name, service_group, description, is_essential in services]
+
+    def service_description(self, execution_id, service_group):
+        """Return the description shared by the services of a group."""
+        with self.lock:
+            return self.descriptions.get((int(execution_id), service_group))
@@ -20,8 +20,24 @@ import logging
 import threading
 import queue
 
+from zoe_lib.config import get_conf
+from zoe_lib.metrics.registry import get_registry
+
 log = logging.getLogger(__name__)
 
+_METRIC_SENDER = None
+
+
+def get_metric_sender() -> 'BaseMetricSender':
+    """Returns the metric sender singleton, None in processes that do not send metrics."""
+    return _METRIC_SENDER
+
+
+def set_metric_sender(sender: 'BaseMetricSender') -> None:
+    """Sets the metric sender singleton, used by the state objects to report lifecycle timings."""
+    global _METRIC_SENDER
+    _METRIC_SENDER = sender
+
 
 def time_diff_ms(start: float, end: float) -> int:
     """Return a time difference in milliseconds."""
@@ -29,26 +45,96 @@ def time_diff_ms(start: float, end: float) -> int:
 
 
 class BaseMetricSender:
-    """Base class for collecting and sending out metrics."""
+    """
+    Base class for collecting and sending out metrics.
 
-    BUFFER_MAX_SIZE = 6
+    Single events are passed to the sender thread through a bounded queue: when it is full, because the sender
+    cannot keep up, new points are dropped and counted instead of blocking the caller. The counters, gauges and
+    histograms of the metrics registry are read every metrics-flush-interval seconds. Points are sent in batches
+    of up to metrics-batch-size, a point waits at most metrics-batch-timeout seconds in the buffer.
+    """
 
     def __init__(self, deployment_name):
-        self._queue = queue.Queue()
+        self._queue = queue.Queue(maxsize=get_conf().metrics_queue_size)
         self._buffer = []
+        self._buffer_since = None
         self._th = None
         self._th = threading.Thread(name='metrics', target=self._metrics_loop, daemon=True)
         self.deployment_name = deployment_name
+        self.registry = get_registry()
+        self.flush_interval = get_conf().metrics_flush_interval
+        self.batch_size = get_conf().metrics_batch_size
+        self.batch_timeout = get_conf().metrics_batch_timeout
+        self._last_flush = time.time()
+        self.dropped = self.registry.counter('metrics_points_dropped', reason='queue_full')
+
+    def _put(self, point):
+        """Pass a point to the sender thread, dropping it if the queue is full."""
+        try:
+            self._queue.put_nowait(point)
+        except queue.Full:
+            self.dropped.inc()
 
     def _start(self):
         self._th.start()
 
     def metric_api_call(self, time_start, action):
-        """Compute and pass the metric point of an API call to the sender thread."""
-        time_end = time.time()
-        diff = time_diff_ms(time_start, time_end)
-        point = "api latency: {} took {} ms".format(action, diff)
-        self._queue.put(point)
+        """Record the latency of an API call in the registry."""
+        self.registry.histogram('api_latency_seconds', command=action).observe(time.time() - time_start)
+
+    def metric_orphan_gc(self, container_count, orphan_count, removed_count):
+        """Pass the result of an orphan container collection pass to the sender thread."""
+        point = "orphan gc: {} containers, {} orphans, {} removed".format(container_count, orphan_count, removed_count)
+        self._put(point)
+
+    def metric_execution_stage(self, zapp_name, user_id, stage, duration, service_name=None):
+        """Pass the duration in seconds of a stage in the lifecycle of an execution or of one of its services to the sender thread."""
+        if service_name is None:
+            point = "execution stage: {} of {} ({}) took {} ms".format(stage, zapp_name, user_id, int(duration * 1000))
+        else:
+            point = "execution stage: {} of {} in {} ({}) took {} ms".format(stage, service_name, zapp_name, user_id, int(duration * 1000))
+        self._put(point)
+
+    def metric_trace_span(self, trace_id, name, start, duration, tags):  # pylint: disable=unused-argument
+        """Pass a span of a request trace to the sender thread."""
+        tags_str = ' '.join(['{}={}'.format(k, v) for k, v in sorted(tags.items())])
+        point = "trace {}: {} took {} ms {}".format(trace_id, name, int(duration * 1000), tags_str).rstrip()
+        self._put(point)
+
+    def _format_registry(self, samples, timestamp):  # pylint: disable=unused-argument
+        """Return the points for a snapshot of the registry, redefine in child classes for other formats."""
+        points = []
+        for metric, sample in samples:
+            labels = ','.join(['{}={}'.format(k, v) for k, v in sorted(metric.labels.items())])
+            if metric.kind == 'histogram':
+                buckets = ' '.join(['<={}:{}'.format(bound, count) for bound, count in sample['buckets']])
+                points.append("{} {}{{{}}}: count {} sum {:.3f} {}".format(metric.kind, metric.name, labels, sample['count'], sample['sum'], buckets))
+            else:
+                points.append("{} {}{{{}}}: {}".format(metric.kind, metric.name, labels, sample['value']))
+        return points
+
+    def _flush_registry(self):
+        """Add a snapshot of the registry to the buffer."""
+        now = time.time()
+        self._last_flush = now
+        try:
+            self._add_to_buffer(self._format_registry(self.registry.collect(), now))
+        except Exception:
+            log.exception('Error reading the metrics registry')
+
+    def _add_to_buffer(self, points):
+        if len(self._buffer) == 0:
+            self._buffer_since = time.time()
+        self._buffer += points
+
+    def _send_batch(self):
+        """Send the buffer if it is full enough or if its oldest point has waited long enough."""
+        if len(self._buffer) == 0:
+            return
+        if len(self._buffer) >= self.batch_size or time.time() - self._buffer_since >= self.batch_timeout:
+            self._send_buffer()
+            if len(self._buffer) > 0:  # not sent, wait again before the next attempt
+                self._buffer_since = time.time()
 
     def _send_buffer(self):
         """
@@ -65,18 +151,19 @@ class BaseMetricSender:
 
     def _metrics_loop(self):
         while True:
+            if time.time() - self._last_flush >= self.flush_interval:
+                self._flush_registry()
             try:
                 data = self._queue.get(timeout=1)
             except queue.Empty:
-                self._send_buffer()
+                self._send_batch()
                 continue
 
             if data == 'quit':
+                self._flush_registry()
                 if len(self._buffer) > 0:
                     self._send_buffer()
                 break
 
-            if data != 'quit':
-                self._buffer.append(data)
-                if len(self._buffer) > self.BUFFER_MAX_SIZE:
-                    self._send_buffer()
+            self._add_to_buffer([data])
+            self._send_batch()
@@ -15,58 +15,177 @@
 
 """InfluxDB implementation of the metrics system."""
 
+import gzip
+import os
 import time
 import logging
 
 import requests
 
 import zoe_lib.metrics.base
+from zoe_lib.config import get_conf
 
 log = logging.getLogger(__name__)
 
 
+def _escape_tag(value) -> str:
+    """Escape a tag value for the InfluxDB line protocol."""
+    return str(value).replace(',', '\\,').replace('=', '\\=').replace(' ', '\\ ')
+
+
+def _string_field(value) -> str:
+    """Quote a string field value for the InfluxDB line protocol."""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
 class InfluxDBMetricSender(zoe_lib.metrics.base.BaseMetricSender):
-    """Sends metrics to InfluxDB."""
+    """
+    Sends metrics to InfluxDB.
+
+    Batches are compressed with gzip and sent over a persistent HTTP connection. When InfluxDB cannot be reached
+    the batches are appended to the spill file, if one is configured, and sent again, oldest first, as soon as
+    InfluxDB comes back. Without a spill file the points are kept in memory, up to metrics-queue-size points.
+    """
 
-    RETRIES = 5
+    RETRY_MAX_DELAY = 60  # seconds
+    SPILL_MAX_SIZE = 64 * 1024 * 1024  # bytes, beyond this spilled points are dropped
 
     def __init__(self, deployment_name, influxdb_url, influxdb_dbname):
         super().__init__(deployment_name)
         self._influxdb_endpoint = influxdb_url + '/write?precision=ms&db=' + influxdb_dbname
-        self._retries = self.RETRIES
+        self._session = requests.Session()
+        self._session.headers.update({'Content-Encoding': 'gzip', 'Content-Type': 'application/octet-stream'})
+        self._spill_file = get_conf().influxdb_spill_file
+        self._max_buffered = get_conf().metrics_queue_size
+        self._retry_delay = 1
+        self._retry_at = 0
+        self._dropped = self.registry.counter('metrics_points_dropped', reason='influxdb_error')
+        self._spilled = self.registry.counter('metrics_points_spilled')
+        self._requests = self.registry.counter('influxdb_writes')
         self._start()
 
+    def _post(self, points) -> bool:
+        """Write a batch of points, return True on success."""
+        payload = gzip.compress('\n'.join(points).encode('utf-8'))
+        self._requests.inc()
+        try:
+            req = self._session.post(self._influxdb_endpoint, data=payload, timeout=10)
+        except requests.RequestException as e:
+            log.error('error writing metrics to influxdb: {}'.format(e))
+            return False
+        if req.status_code != 204:
+            log.error('error writing metrics to influxdb: {} {}'.format(req.status_code, req.text.strip()))
+            return False
+        return True
+
     def _send_buffer(self):
-        error = False
-        if self._influxdb_endpoint is not None and len(self._buffer) > 0:
-            payload = '\n'.join(self._buffer)
-            try:
-                req = requests.post(self._influxdb_endpoint, data=payload)
-            except Exception:
-                log.exception('error writing metrics to influxdb, will retry {} times'.format(self._retries))
-                error = True
-            else:
-                if req.status_code != 204:
-                    log.error('error writing metrics to influxdb, will retry {} times'.format(self._retries))
-                    error = True
-        if error:
-            if self._retries <= 0:
-                self._retries = self.RETRIES
+        if len(self._buffer) == 0:
+            return
+        if time.time() >= self._retry_at:
+            if self._send_spilled() and self._post(self._buffer):
                 self._buffer.clear()
-            else:
-                self._retries -= 1
-        else:
+                self._retry_delay = 1
+                return
+            self._retry_at = time.time() + self._retry_delay
+            self._retry_delay = min(self._retry_delay * 2, self.RETRY_MAX_DELAY)
+
+        if self._spill_file != '':
+            self._spill(self._buffer)
             self._buffer.clear()
+        elif len(self._buffer) > self._max_buffered:
+            excess = len(self._buffer) - self._max_buffered
+            del self._buffer[:excess]
+            self._dropped.inc(excess)
+
+    def _spill(self, points):
+        try:
+            size = os.path.getsize(self._spill_file) if os.path.exists(self._spill_file) else 0
+            if size > self.SPILL_MAX_SIZE:
+                self._dropped.inc(len(points))
+                return
+            with open(self._spill_file, 'a') as spill:
+                spill.write('\n'.join(points) + '\n')
+            self._spilled.inc(len(points))
+        except OSError as e:
+            log.error('cannot write metrics to the spill file {}: {}'.format(self._spill_file, e))
+            self._dropped.inc(len(points))
+
+    def _send_spilled(self) -> bool:
+        """Send the points saved in the spill file, return True if there are none left."""
+        if self._spill_file == '' or not os.path.exists(self._spill_file):
+            return True
+        try:
+            with open(self._spill_file, 'r') as spill:
+                points = [line.rstrip('\n') for line in spill if line.strip() != '']
+        except OSError as e:
+            log.error('cannot read the metrics spill file {}: {}'.format(self._spill_file, e))
+            return True
+        for idx in range(0, len(points), self.batch_size):
+            if not self._post(points[idx:idx + self.batch_size]):
+                with open(self._spill_file, 'w') as spill:  # keep only what has not been sent
+                    spill.write('\n'.join(points[idx:]) + '\n')
+                return False
+        os.unlink(self._spill_file)
+        log.info('sent {} metrics points saved while influxdb was unreachable'.format(len(points)))
+        return True
 
-    def metric_api_call(self, time_start, action):
-        """Compute and emit the run time of an API call."""
+    def _format_registry(self, samples, timestamp):
+        """One point for each counter and gauge, with a value field, one for each histogram, with a field per bucket."""
+        points = []
+        for metric, sample in samples:
+            point_str = metric.name
+            for key, value in sorted(metric.labels.items()):
+                point_str += ',' + key + '=' + _escape_tag(value)
+            point_str += ',' + 'deployment' + '=' + self.deployment_name
+            if metric.kind == 'histogram':
+                point_str += " count=" + str(sample['count'])
+                point_str += ",sum=" + str(sample['sum'])
+                for bound, count in sample['buckets']:
+                    point_str += ",le_" + ('inf' if bound == float('inf') else str(bound)) + "=" + str(count)
+            else:
+                point_str += " value=" + str(sample['value'])
+            point_str += " " + str(int(timestamp * 1000))
+            points.append(point_str)
+        return points
+
+    def metric_orphan_gc(self, container_count, orphan_count, removed_count):
+        """Emit the result of an orphan container collection pass."""
         time_end = time.time()
-        diff = zoe_lib.metrics.base.time_diff_ms(time_start, time_end)
 
-        point_str = "api_latency"
-        point_str += ",api_call=" + action
+        point_str = "orphan_gc"
         point_str += ',' + 'deployment' + '=' + self.deployment_name
-        point_str += " value=" + str(diff)
+        point_str += " containers=" + str(container_count)
+        point_str += ",orphans=" + str(orphan_count)
+        point_str += ",removed=" + str(removed_count)
         point_str += " " + str(int(time_end * 1000))
 
-        self._queue.put(point_str)
+        self._put(point_str)
+
+    def metric_execution_stage(self, zapp_name, user_id, stage, duration, service_name=None):
+        """Emit the duration of a stage in the lifecycle of an execution or of one of its services."""
+        time_end = time.time()
+
+        point_str = "execution_stage"
+        point_str += ",stage=" + stage
+        point_str += ",zapp=" + _escape_tag(zapp_name)
+        point_str += ",user=" + _escape_tag(user_id)
+        if service_name is not None:
+            point_str += ",service=" + _escape_tag(service_name)
+        point_str += ',' + 'deployment' + '=' + self.deployment_name
+        point_str += " value=" + str(int(duration * 1000))
+        point_str += " " + str(int(time_end * 1000))
+
+        self._put(point_str)
+
+    def metric_trace_span(self, trace_id, name, start, duration, tags):
+        """Emit a span of a request trace. The trace ID and the span tags are fields, to keep the number of series low."""
+        point_str = "trace_span"
+        point_str += ",span=" + _escape_tag(name)
+        point_str += ',' + 'deployment' + '=' + self.deployment_name
+        point_str += " value=" + str(duration * 1000)
+        point_str += ",trace_id=" + _string_field(trace_id)
+        for key, value in sorted(tags.items()):
+            point_str += "," + key + "=" + _string_field(value)
+        point_str += " " + str(int(start * 1000))
+
+        self._put(point_str)
@@ -0,0 +1,112 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Prometheus text exposition of the metrics registry, served over HTTP for scraping."""
+
+import http.server
+import logging
+import socketserver
+import threading
+
+from zoe_lib.metrics.registry import get_registry, MetricsRegistry
+
+log = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'zoe_'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels: dict, extra=None) -> str:
+    items = sorted(labels.items())
+    if extra is not None:
+        items.append(extra)
+    if len(items) == 0:
+        return ''
+    return '{' + ','.join(['{}="{}"'.format(k, _escape(v)) for k, v in items]) + '}'
+
+
+def _number(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_registry(registry: MetricsRegistry=None) -> str:
+    """Return the current value of all the metrics in the registry, in the Prometheus text format."""
+    if registry is None:
+        registry = get_registry()
+    lines = []
+    declared = set()
+    for metric, sample in registry.collect():
+        name = PREFIX + metric.name
+        if name not in declared:  # samples are sorted by name, so all the label sets of a metric follow its TYPE line
+            lines.append('# TYPE {} {}'.format(name, metric.kind))
+            declared.add(name)
+        if metric.kind == 'histogram':
+            for bound, count in sample['buckets']:
+                lines.append('{}_bucket{} {}'.format(name, _labels(metric.labels, ('le', _number(bound))), count))
+            lines.append('{}_sum{} {}'.format(name, _labels(metric.labels), _number(sample['sum'])))
+            lines.append('{}_count{} {}'.format(name, _labels(metric.labels), sample['count']))
+        else:
+            lines.append('{}{} {}'.format(name, _labels(metric.labels), _number(sample['value'])))
+    return '\n'.join(lines) + '\n'
+
+
+class _MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the registry on /metrics."""
+    def do_GET(self):  # pylint: disable=invalid-name
+        """HTTP GET method."""
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = format_registry().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Scrapes are frequent, log them only in debug mode."""
+        log.debug('{} - {}'.format(self.address_string(), format % args))
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+class PrometheusListener(threading.Thread):
+    """A minimal HTTP server for processes that do not have one, like the master."""
+
+    def __init__(self, address: str, port: int) -> None:
+        super().__init__()
+        self.setName('prometheus')
+        self.setDaemon(True)
+        self.server = _ThreadingHTTPServer((address, port), _MetricsRequestHandler)
+        log.info('Serving metrics for Prometheus on http://{}:{}/metrics'.format(address, self.server.server_port))
+        self.start()
+
+    def run(self):
+        """The thread loop."""
+        self.server.serve_forever()
+
+    def quit(self):
+        """Stops the thread."""
+        self.server.shutdown()
+        self.server.server_close()
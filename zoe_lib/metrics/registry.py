@@ -0,0 +1,144 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-process metrics: counters, gauges and histograms aggregated in memory and read periodically by the senders."""
+
+import bisect
+import threading
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # seconds
+
+
+class Counter:
+    """A value that can only increase, from the start of the process."""
+    kind = 'counter'
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """Increment the counter."""
+        with self._lock:
+            self.value += amount
+
+    def sample(self):
+        """Current value."""
+        return {'value': self.value}
+
+
+class Gauge:
+    """A value that can go up and down, set explicitly or read from a function when sampled."""
+    kind = 'gauge'
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        """Set the current value."""
+        self.value = value
+
+    def sample(self):
+        """Current value."""
+        if self.function is not None:
+            return {'value': self.function()}
+        return {'value': self.value}
+
+
+class Histogram:
+    """Counts observations in fixed buckets, also keeping their number and sum."""
+    kind = 'histogram'
+
+    def __init__(self, name, labels, buckets):
+        self.name = name
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # the last bucket is for values above all bounds
+        self.count = 0
+        self.sum = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Add an observation."""
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.sum += value
+
+    def sample(self):
+        """Number and sum of the observations, with the cumulative count for each bucket upper bound."""
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+            total = self.sum
+        cumulative = []
+        running = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            running += bucket_count
+            cumulative.append((bound, running))
+        return {'count': count, 'sum': total, 'buckets': cumulative}
+
+
+class MetricsRegistry:
+    """
+    Holds all the metrics of the process, identified by name and labels.
+
+    Metric objects should be looked up once and kept, updating them is cheap and thread-safe.
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, factory, name, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._metrics:
+                self._metrics[key] = factory()
+            return self._metrics[key]
+
+    def counter(self, name, **labels) -> Counter:
+        """Return the counter with this name and labels, creating it if needed."""
+        return self._get(lambda: Counter(name, labels), name, labels)
+
+    def gauge(self, name, function=None, **labels) -> Gauge:
+        """Return the gauge with this name and labels, creating it if needed. If function is given, it is called to read the value."""
+        gauge = self._get(lambda: Gauge(name, labels), name, labels)
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def histogram(self, name, buckets=DEFAULT_BUCKETS, **labels) -> Histogram:
+        """Return the histogram with this name and labels, creating it if needed."""
+        return self._get(lambda: Histogram(name, labels, buckets), name, labels)
+
+    def collect(self):
+        """Return a list of (metric, sample) for all the metrics, sorted by name."""
+        with self._lock:
+            metrics = sorted(self._metrics.items(), key=lambda x: x[0])
+        return [(metric, metric.sample()) for key_, metric in metrics]
+
+
+_REGISTRY = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """Returns the registry singleton."""
+    return _REGISTRY
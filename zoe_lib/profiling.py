@@ -0,0 +1,145 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+On-demand profiling of a running process.
+
+The sampling profiler reads the stack of every thread at a fixed interval, for a limited time, and counts how
+many times each function is seen. Nothing runs while no profile has been requested. Only one profile can run
+at a time in a process: it is started with profile_start() and its results are read with profile_result().
+"""
+
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+
+log = logging.getLogger(__name__)
+
+MAX_DURATION = 300  # seconds
+DEFAULT_INTERVAL = 0.01  # seconds
+TOP_FUNCTIONS = 50
+TOP_STACKS = 200
+
+_PROFILER = None
+_PROFILER_LOCK = threading.Lock()
+
+
+def _thread_names():
+    return dict([(th.ident, th.name) for th in threading.enumerate()])
+
+
+def thread_stacks():
+    """Return the current stack of each thread of the process, as a dictionary thread name -> list of lines."""
+    names = _thread_names()
+    stacks = {}
+    for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+        name = '{} ({})'.format(names.get(ident, 'unknown'), ident)
+        stacks[name] = [line.rstrip('\n') for line in traceback.format_stack(frame)]
+    return stacks
+
+
+def _frame_key(frame):
+    code = frame.f_code
+    return '{}:{}({})'.format(code.co_filename, code.co_firstlineno, code.co_name)
+
+
+class SamplingProfiler(threading.Thread):
+    """Samples the stacks of all the other threads until the duration expires."""
+
+    def __init__(self, duration: float, interval: float=DEFAULT_INTERVAL) -> None:
+        super().__init__()
+        self.setName('profiler')
+        self.setDaemon(True)
+        self.duration = min(duration, MAX_DURATION)
+        self.interval = interval
+        self.samples = 0
+        self.self_counts = collections.Counter()  # function -> samples where it was running
+        self.total_counts = collections.Counter()  # function -> samples where it was on the stack
+        self.stack_counts = collections.Counter()  # thread;outer;...;inner -> samples
+        self.lock = threading.Lock()
+        self.time_start = time.time()
+        self.time_end = None
+        self.start()
+
+    def run(self):
+        """The thread loop."""
+        log.info('Profiling all threads for {} seconds'.format(self.duration))
+        deadline = self.time_start + self.duration
+        while time.time() < deadline:
+            with self.lock:
+                self._sample()
+            time.sleep(self.interval)
+        self.time_end = time.time()
+        log.info('Profiling finished, {} samples'.format(self.samples))
+
+    def _sample(self):
+        names = _thread_names()
+        for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+            if ident == self.ident:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            if len(stack) == 0:
+                continue
+            self.self_counts[stack[0]] += 1
+            for function in set(stack):
+                self.total_counts[function] += 1
+            stack.reverse()
+            self.stack_counts[';'.join([names.get(ident, 'unknown')] + stack)] += 1
+        self.samples += 1
+
+    def running(self) -> bool:
+        """True until the duration has expired."""
+        return self.time_end is None
+
+    def result(self):
+        """The profile, in a form that can be serialized to JSON."""
+        with self.lock:
+            return self._result()
+
+    def _result(self):
+        return {
+            'status': 'running' if self.running() else 'finished',
+            'time_start': self.time_start,
+            'duration': self.duration,
+            'interval': self.interval,
+            'samples': self.samples,
+            'functions': [{'function': function, 'self': count, 'total': self.total_counts[function]} for function, count in self.self_counts.most_common(TOP_FUNCTIONS)],
+            'cumulative': [{'function': function, 'total': count} for function, count in self.total_counts.most_common(TOP_FUNCTIONS)],
+            'stacks': ['{} {}'.format(stack, count) for stack, count in self.stack_counts.most_common(TOP_STACKS)]
+        }
+
+
+def profile_start(duration: float, interval: float=DEFAULT_INTERVAL) -> bool:
+    """Start profiling the process, return False if a profile is already running."""
+    global _PROFILER
+    with _PROFILER_LOCK:
+        if _PROFILER is not None and _PROFILER.running():
+            return False
+        _PROFILER = SamplingProfiler(duration, interval)
+        return True
+
+
+def profile_result():
+    """The results of the last profile, None if no profile has been started."""
+    with _PROFILER_LOCK:
+        if _PROFILER is None:
+            return None
+        return _PROFILER.result()
@@ -15,19 +15,83 @@
 
 """Interface to PostgresQL for Zoe state."""
 
+import collections
+import contextlib
 import datetime
 import logging
+import re
+import threading
+import time
 
 import psycopg2
 import psycopg2.extras
 
 from zoe_lib.config import get_conf
+from zoe_lib.metrics.base import get_metric_sender
+from zoe_lib.metrics.registry import get_registry
 from zoe_lib.swarm_client import SwarmClient
+from zoe_lib.tracing import span
 
 log = logging.getLogger(__name__)
 
 psycopg2.extensions.register_adapter(dict, psycopg2.extras.Json)
 
+STATEMENT_KEY_LENGTH = 200
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+DESCRIPTION_CACHE_SIZE = 2000  # service groups
+
+_QUERY_STATS = threading.local()
+
+
+def statement_key(query: str) -> str:
+    """
+    Normalize a query, replacing placeholders and literal values, so that it can be used to aggregate timings.
+
+    Repeated groups of values, as in multi-row inserts, are collapsed into one, so that the key does not depend on the
+    number of rows.
+    """
+    key = re.sub(r"'[^']*'", '?', query)
+    key = key.replace('%s', '?')
+    key = re.sub(r'\b\d+\b', '?', key)
+    key = re.sub(r'(\([^()]*\))(\s*,\s*\1)+', r'\1', key)
+    return ' '.join(key.split())[:STATEMENT_KEY_LENGTH]
+
+
+@contextlib.contextmanager
+def query_stats(request_name: str):
+    """
+    Count the queries run by the calling thread in the block.
+
+    At the end the count is logged in debug mode and recorded in the db_queries_per_request histogram, so that
+    requests that run a query per item of a list stand out. Nested blocks also count toward the outer one.
+    """
+    parent = getattr(_QUERY_STATS, 'current', None)
+    stats = {'count': 0, 'time': 0.0}
+    _QUERY_STATS.current = stats
+    try:
+        yield stats
+    finally:
+        _QUERY_STATS.current = parent
+        if parent is not None:
+            parent['count'] += stats['count']
+            parent['time'] += stats['time']
+        get_registry().histogram('db_queries_per_request', buckets=QUERY_COUNT_BUCKETS, request=request_name).observe(stats['count'])
+        if stats['count'] > 0:
+            log.debug('{}: {} queries, {:.1f} ms in the database'.format(request_name, stats['count'], stats['time'] * 1000))
+
+
+def _query_stats_add(duration):
+    stats = getattr(_QUERY_STATS, 'current', None)
+    if stats is not None:
+        stats['count'] += 1
+        stats['time'] += duration
+
+
+def _select_columns(fields):
+    if fields is None:
+        return '*'
+    return ', '.join(['id'] + [field for field in fields if field != 'id'])
+
 
 class SQLManager:
     """The SQLManager class, should be used as a singleton."""
@@ -38,8 +102,28 @@ class SQLManager:
         self.port = conf.dbport
         self.dbname = conf.dbname
         self.schema = conf.deployment_name
-        self.conn = None
-        self._connect()
+        self.reconnections = get_registry().counter('db_reconnections')
+        self.slow_queries = get_registry().counter('db_slow_queries')
+        self.slow_query_threshold = conf.db_slow_query_threshold
+        self.query_histograms = {}  # statement key -> histogram
+        self._local = threading.local()  # connection and pending updates of the calling thread
+        self._connections = {}  # thread -> connection
+        self._connections_lock = threading.Lock()
+        self._descriptions = collections.OrderedDict()  # (execution id, service group) -> description, least recently used first
+        self._descriptions_lock = threading.Lock()
+        get_registry().gauge('db_connections_open', function=self._connections_open)
+        get_registry().gauge('db_connections_busy', function=self._connections_busy)
+        self._connection()
+
+    def _connections_open(self):
+        with self._connections_lock:
+            return len([conn for conn in self._connections.values() if conn.closed == 0])
+
+    def _connections_busy(self):
+        """Connections with a transaction in progress."""
+        with self._connections_lock:
+            connections = [conn for conn in self._connections.values() if conn.closed == 0]
+        return len([conn for conn in connections if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE])
 
     def _connect(self):
         dsn = 'dbname=' + self.dbname + \
@@ -48,28 +132,140 @@ class SQLManager:
               ' host=' + self.host + \
               ' port=' + str(self.port)
 
-        self.conn = psycopg2.connect(dsn)
+        conn = psycopg2.connect(dsn)
+        conn.autocommit = True  # transactions are opened only by units of work, reads must not leave one idle
+        cur = conn.cursor()
+        self._execute(cur, 'search_path', 'SET search_path TO {},public'.format(self.schema))
+
+        with self._connections_lock:
+            for thread in [th for th in self._connections if not th.is_alive()]:
+                self._connections.pop(thread).close()
+            self._connections[threading.current_thread()] = conn
+        self._local.conn = conn
+        return conn
+
+    def _connection(self):
+        """The connection of the calling thread: transactions of different threads must not mix."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return self._connect()
+        elif conn.closed != 0:
+            self.reconnections.inc()
+            return self._connect()
+        return conn
 
     def _cursor(self):
         try:
-            cur = self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            return self._connection().cursor(cursor_factory=psycopg2.extras.DictCursor)
         except psycopg2.InterfaceError:
-            self._connect()
-            cur = self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        cur.execute('SET search_path TO {},public'.format(self.schema))
-        return cur
+            self.reconnections.inc()
+            return self._connect().cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+    def _execute(self, cur, name, query, args=None):
+        """Run a query, recording its duration by statement and as a span of the current trace."""
+        time_start = time.time()
+        with span('db ' + name):
+            try:
+                cur.execute(query, args)
+            except psycopg2.Error:
+                if cur.connection.closed == 0 and cur.connection.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_INERROR:
+                    cur.connection.rollback()  # an aborted transaction refuses any other statement
+                raise
+        self._query_done(query, time.time() - time_start, cur)
+
+    def _commit(self):
+        """Commit the transaction of the calling thread, unless it is part of a unit of work."""
+        if self._pending() is not None or self._connection().autocommit:
+            return
+        time_start = time.time()
+        with span('db commit'):
+            self._connection().commit()
+        self._query_done('COMMIT', time.time() - time_start)
+
+    def _pending(self):
+        return getattr(self._local, 'pending', None)
+
+    @contextlib.contextmanager
+    def unit_of_work(self):
+        """
+        Group the state changes made by the calling thread in the block into a single transaction.
 
-    def execution_list(self, only_one=False, **kwargs):
+        Updates to executions and services are merged by row and written at the end of the block, so that a
+        sequence of status transitions costs one UPDATE per row and one commit. Inserts are run immediately
+        but committed with the rest. The block is flushed also when it exits with an exception, since the
+        changes record what really happened (a container may have been created). Nested blocks are part of
+        the outermost one. Outside of a unit of work every statement is committed on its own.
+        """
+        if self._pending() is not None:
+            yield
+            return
+        self._connection().autocommit = False
+        self._local.pending = collections.OrderedDict()  # (table, id) -> column values
+        try:
+            yield
+        finally:
+            pending = self._local.pending
+            self._local.pending = None
+            try:
+                self._flush(pending)
+            finally:
+                if self._local.conn.closed == 0:
+                    self._local.conn.autocommit = True
+
+    def _flush(self, pending):
+        cur = self._cursor()
+        try:
+            for (table, row_id), values in pending.items():
+                self._update(cur, table, row_id, values)
+            self._commit()
+        except psycopg2.Error:
+            if self._local.conn.closed == 0:
+                self._local.conn.rollback()
+            raise
+
+    def _update(self, cur, table, row_id, values):
+        arg_list = []
+        value_list = []
+        for key, value in values.items():
+            arg_list.append('{} = %s'.format(key))
+            value_list.append(value)
+        set_q = ", ".join(arg_list)
+        value_list.append(row_id)
+        q_base = 'UPDATE ' + table + ' SET ' + set_q + ' WHERE id=%s'
+        self._execute(cur, table + '_update', q_base, value_list)
+
+    def _update_or_defer(self, table, row_id, values):
+        pending = self._pending()
+        if pending is not None:
+            pending.setdefault((table, int(row_id)), {}).update(values)
+            return
+        cur = self._cursor()
+        self._update(cur, table, row_id, values)
+        self._commit()
+
+    def _query_done(self, query, duration, cur=None):
+        statement = statement_key(query)
+        if statement not in self.query_histograms:
+            self.query_histograms[statement] = get_registry().histogram('db_query_seconds', statement=statement)
+        self.query_histograms[statement].observe(duration)
+        _query_stats_add(duration)
+        if 0 < self.slow_query_threshold <= duration:
+            self.slow_queries.inc()
+            log.warning('Slow query ({:.3f}s): {}'.format(duration, cur.query.decode('utf-8', 'replace') if cur is not None and cur.query is not None else query))
+
+    def execution_list(self, only_one=False, fields=None, **kwargs):
         """
         Return a list of executions.
 
         :param only_one: only one result is expected
         :type only_one: bool
+        :param fields: read only these columns, in addition to the ID, the others are loaded on first access
+        :type fields: list
         :param kwargs: filter executions based on their fields/columns
         :return: one or more executions
         """
         cur = self._cursor()
-        q_base = 'SELECT * FROM execution'
+        q_base = 'SELECT ' + _select_columns(fields) + ' FROM execution'
         if len(kwargs) > 0:
             q = q_base + " WHERE "
             filter_list = []
@@ -78,11 +274,10 @@ class SQLManager:
                 filter_list.append('{} = %s'.format(key))
                 args_list.append(value)
             q += ' AND '.join(filter_list)
-            query = cur.mogrify(q, args_list)
+            self._execute(cur, 'execution_list', q, args_list)
         else:
-            query = cur.mogrify(q_base)
+            self._execute(cur, 'execution_list', q_base)
 
-        cur.execute(query)
         if only_one:
             row = cur.fetchone()
             if row is None:
@@ -93,49 +288,48 @@ class SQLManager:
 
     def execution_update(self, exec_id, **kwargs):
         """Update the state of an execution."""
+        self._update_or_defer('execution', exec_id, kwargs)
+
+    def execution_runtime_averages(self):
+        """Return a dictionary with the average run time in seconds of terminated executions, by ZApp name."""
         cur = self._cursor()
-        arg_list = []
-        value_list = []
-        for key, value in kwargs.items():
-            arg_list.append('{} = %s'.format(key))
-            value_list.append(value)
-        set_q = ", ".join(arg_list)
-        value_list.append(exec_id)
-        q_base = 'UPDATE execution SET ' + set_q + ' WHERE id=%s'
-        query = cur.mogrify(q_base, value_list)
-        cur.execute(query)
-        self.conn.commit()
+        self._execute(cur, 'execution_runtime_averages', "SELECT description->>'name', AVG(EXTRACT(EPOCH FROM (time_end - time_start))) FROM execution WHERE status = %s AND time_start IS NOT NULL AND time_end IS NOT NULL GROUP BY description->>'name'", (Execution.TERMINATED_STATUS,))
+        return dict([(row[0], float(row[1])) for row in cur])
 
     def execution_new(self, name, user_id, description):
         """Create a new execution in the state."""
         cur = self._cursor()
         status = Execution.SUBMIT_STATUS
         time_submit = datetime.datetime.now()
-        query = cur.mogrify('INSERT INTO execution (id, name, user_id, description, status, time_submit) VALUES (DEFAULT, %s,%s,%s,%s,%s) RETURNING id', (name, user_id, description, status, time_submit))
-        cur.execute(query)
-        self.conn.commit()
+        query = 'INSERT INTO execution (id, name, user_id, description, status, time_submit) VALUES (DEFAULT, %s,%s,%s,%s,%s) RETURNING id'
+        self._execute(cur, 'execution_new', query, (name, user_id, description, status, time_submit))
+        self._commit()
         return cur.fetchone()[0]
 
     def execution_delete(self, execution_id):
         """Delete an execution and its services from the state."""
-        cur = self._cursor()
-        query = "DELETE FROM service WHERE execution_id = %s"
-        cur.execute(query, (execution_id,))
-        query = "DELETE FROM execution WHERE id = %s"
-        cur.execute(query, (execution_id,))
-        self.conn.commit()
-
-    def service_list(self, only_one=False, **kwargs):
+        with self.unit_of_work():
+            cur = self._cursor()
+            query = "DELETE FROM service WHERE execution_id = %s"
+            self._execute(cur, 'execution_delete', query, (execution_id,))
+            query = "DELETE FROM service_description WHERE execution_id = %s"
+            self._execute(cur, 'execution_delete', query, (execution_id,))
+            query = "DELETE FROM execution WHERE id = %s"
+            self._execute(cur, 'execution_delete', query, (execution_id,))
+
+    def service_list(self, only_one=False, fields=None, **kwargs):
         """
         Return a list of services.
 
         :param only_one: only one result is expected
         :type only_one: bool
+        :param fields: read only these columns, in addition to the ID, the others are loaded on first access
+        :type fields: list
         :param kwargs: filter services based on their fields/columns
         :return: one or more services
         """
         cur = self._cursor()
-        q_base = 'SELECT * FROM service'
+        q_base = 'SELECT ' + _select_columns(fields) + ' FROM service'
         if len(kwargs) > 0:
             q = q_base + " WHERE "
             filter_list = []
@@ -144,11 +338,10 @@ class SQLManager:
                 filter_list.append('{} = %s'.format(key))
                 args_list.append(value)
             q += ' AND '.join(filter_list)
-            query = cur.mogrify(q, args_list)
+            self._execute(cur, 'service_list', q, args_list)
         else:
-            query = cur.mogrify(q_base)
+            self._execute(cur, 'service_list', q_base)
 
-        cur.execute(query)
         if only_one:
             row = cur.fetchone()
             if row is None:
@@ -157,41 +350,115 @@ class SQLManager:
         else:
             return [Service(x, self) for x in cur]
 
+    def service_docker_ids(self):
+        """Return the set of docker IDs of all the services that have a container in Swarm."""
+        cur = self._cursor()
+        self._execute(cur, 'service_docker_ids', 'SELECT docker_id FROM service WHERE docker_id IS NOT NULL')
+        return set([row[0] for row in cur])
+
     def service_update(self, service_id, **kwargs):
         """Update the state of an existing service."""
-        cur = self._cursor()
-        arg_list = []
-        value_list = []
-        for key, value in kwargs.items():
-            arg_list.append('{} = %s'.format(key))
-            value_list.append(value)
-        set_q = ", ".join(arg_list)
-        value_list.append(service_id)
-        q_base = 'UPDATE service SET ' + set_q + ' WHERE id=%s'
-        query = cur.mogrify(q_base, value_list)
-        cur.execute(query)
-        self.conn.commit()
+        self._update_or_defer('service', service_id, kwargs)
 
-    def service_new(self, execution_id, name, service_group, description):
+    def service_new(self, execution_id, name, service_group, description, is_essential):
         """Adds a new service to the state."""
+        return self.services_new(execution_id, [(name, service_group, description, is_essential)])[0]
+
+    def services_new(self, execution_id, services):
+        """
+        Adds the services of an execution to the state with a single query.
+
+        The description of each service group is stored once, in the service_description table, unless it is
+        already there.
+
+        :param services: list of (name, service_group, description, is_essential) tuples
+        :return: the IDs of the new services, in the same order
+        """
+        if len(services) == 0:
+            return []
         cur = self._cursor()
         status = 'created'
-        query = cur.mogrify('INSERT INTO service (id, status, error_message, execution_id, name, service_group, description) VALUES (DEFAULT, %s,NULL,%s,%s,%s,%s) RETURNING id', (status, execution_id, name, service_group, description))
-        cur.execute(query)
-        self.conn.commit()
-        return cur.fetchone()[0]
+        descriptions = collections.OrderedDict()
+        rows = []
+        args = []
+        for ordinal, (name, service_group, description, is_essential) in enumerate(services):
+            descriptions[service_group] = description
+            rows.append('(%s,%s,%s,%s,%s,%s)')
+            args += [ordinal, status, execution_id, name, service_group, is_essential]
+        group_args = []
+        for service_group, description in descriptions.items():
+            group_args += [execution_id, service_group, description]
+        with self.unit_of_work():
+            query = 'INSERT INTO service_description (execution_id, service_group, description) VALUES ' + ','.join(['(%s,%s,%s)'] * len(descriptions)) + ' ON CONFLICT (execution_id, service_group) DO NOTHING'
+            self._execute(cur, 'service_description_new', query, group_args)
+            # the order of the returned rows is not guaranteed, each ID is taken from the sequence next to the ordinal of its row
+            query = 'WITH v (ordinal, status, execution_id, name, service_group, essential) AS (VALUES ' + ','.join(rows) + '), ' + \
+                    "n AS (SELECT nextval(pg_get_serial_sequence('service', 'id')) AS id, v.* FROM v), " + \
+                    'i AS (INSERT INTO service (id, status, error_message, execution_id, name, service_group, essential) SELECT id, status, NULL, execution_id, name, service_group, essential FROM n) ' + \
+                    'SELECT ordinal, id FROM n'
+            self._execute(cur, 'services_new', query, args)
+        service_ids = dict([(row[0], row[1]) for row in cur])
+        self._cache_descriptions(execution_id, descriptions)
+        return [service_ids[ordinal] for ordinal in range(len(services))]
+
+    def service_description(self, execution_id, service_group):
+        """
+        Return the description shared by the services of a group.
+
+        Descriptions never change, so they are kept in a cache of limited size. On a miss the descriptions of all
+        the groups of the execution are read, since services are usually looked at one execution at a time.
+        """
+        key = (int(execution_id), service_group)
+        with self._descriptions_lock:
+            if key in self._descriptions:
+                self._descriptions.move_to_end(key)
+                return self._descriptions[key]
+        cur = self._cursor()
+        self._execute(cur, 'service_description', 'SELECT service_group, description FROM service_description WHERE execution_id = %s', (execution_id,))
+        descriptions = dict([(row[0], row[1]) for row in cur])
+        self._cache_descriptions(execution_id, descriptions)
+        return descriptions.get(service_group)
+
+    def _cache_descriptions(self, execution_id, descriptions):
+        with self._descriptions_lock:
+            for service_group, description in descriptions.items():
+                key = (int(execution_id), service_group)
+                self._descriptions[key] = description
+                self._descriptions.move_to_end(key)
+            while len(self._descriptions) > DESCRIPTION_CACHE_SIZE:
+                self._descriptions.popitem(last=False)
 
 
 class Base:
     """
     :type sql_manager: SQLManager
     """
+    COLUMNS = ()  # (column, attribute) for the columns other than the ID
+
     def __init__(self, d, sql_manager):
         """
         :type sql_manager: SQLManager
         """
         self.sql_manager = sql_manager
         self.id = d['id']
+        self._partial = any(column not in d for column, attribute_ in self.COLUMNS)
+
+    def __getattr__(self, name):
+        """Only called for missing attributes: the columns left out by a projection are all loaded on first access."""
+        if name.startswith('__') or not self.__dict__.get('_partial', False):
+            raise AttributeError(name)
+        self._partial = False
+        full = self._load()
+        if full is None:
+            raise AttributeError(name)
+        for column_, attribute in self.COLUMNS:
+            if attribute not in self.__dict__:
+                setattr(self, attribute, getattr(full, attribute))
+        return getattr(self, name)
+
+    def _load(self):
+        """Read the complete object from the state."""
+        raise NotImplementedError
 
     def serialize(self):
         """Generates a dictionary that can be serialized in JSON."""
@@ -215,30 +482,23 @@ class Execution(Base):
     CLEANING_UP_STATUS = "cleaning up"
     TERMINATED_STATUS = "terminated"
 
+    COLUMNS = (('user_id', 'user_id'), ('name', 'name'), ('description', 'description'), ('time_submit', 'time_submit'),
+               ('time_start', 'time_start'), ('time_end', 'time_end'), ('status', '_status'), ('error_message', 'error_message'))
+
     def __init__(self, d, sql_manager):
         super().__init__(d, sql_manager)
+        self.trace_id = None  # request that submitted the execution, set by the scheduler
+        self._stage_start = {}  # status -> time the execution entered it, for the lifecycle metrics
 
-        self.user_id = d['user_id']
-        self.name = d['name']
-        self.description = d['description']
-
-        if isinstance(d['time_submit'], datetime.datetime):
-            self.time_submit = d['time_submit']
-        else:
-            self.time_submit = datetime.datetime.fromtimestamp(d['time_submit'])
-
-        if isinstance(d['time_submit'], datetime.datetime):
-            self.time_start = d['time_start']
-        else:
-            self.time_start = datetime.datetime.fromtimestamp(d['time_start'])
-
-        if isinstance(d['time_submit'], datetime.datetime):
-            self.time_end = d['time_end']
-        else:
-            self.time_submit = datetime.datetime.fromtimestamp(d['time_start'])
+        for column, attribute in self.COLUMNS:
+            if column in d:
+                value = d[column]
+                if column.startswith('time_') and value is not None and not isinstance(value, datetime.datetime):
+                    value = datetime.datetime.fromtimestamp(value)
+                setattr(self, attribute, value)
 
-        self._status = d['status']
-        self.error_message = d['error_message']
+    def _load(self):
+        return self.sql_manager.execution_list(only_one=True, id=self.id)
 
     def serialize(self):
         """Generates a dictionary that can be serialized in JSON."""
@@ -261,27 +521,33 @@ class Execution(Base):
     def set_scheduled(self):
         """The execution has been added to the scheduler queues."""
         self._status = self.SCHEDULED_STATUS
+        self._stage_start[self._status] = time.time()
         self.sql_manager.execution_update(self.id, status=self._status)
 
     def set_starting(self):
         """The services of the execution are being created in Swarm."""
         self._status = self.STARTING_STATUS
+        self._stage_end('queue_wait', self.SCHEDULED_STATUS, self.time_submit.timestamp())
+        self._stage_start[self._status] = time.time()
         self.sql_manager.execution_update(self.id, status=self._status)
 
     def set_running(self):
         """The execution is running and producing useful work."""
         self._status = self.RUNNING_STATUS
+        self._stage_end('startup', self.STARTING_STATUS)
         self.time_start = datetime.datetime.now()
         self.sql_manager.execution_update(self.id, status=self._status, time_start=self.time_start)
 
     def set_cleaning_up(self):
         """The services of the execution are being terminated."""
         self._status = self.CLEANING_UP_STATUS
+        self._stage_start[self._status] = time.time()
         self.sql_manager.execution_update(self.id, status=self._status)
 
     def set_terminated(self):
         """The execution is not running."""
         self._status = self.TERMINATED_STATUS
+        self._stage_end('termination', self.CLEANING_UP_STATUS)
         self.time_end = datetime.datetime.now()
         self.sql_manager.execution_update(self.id, status=self._status, time_end=self.time_end)
 
@@ -296,6 +562,18 @@ class Execution(Base):
         self.error_message = message
         self.sql_manager.execution_update(self.id, error_message=self.error_message)
 
+    def _stage_end(self, stage, status, default_start=None):
+        """Send the time spent in a status, if it was entered by this object, otherwise since default_start."""
+        start = self._stage_start.pop(status, default_start)
+        if start is not None:
+            self.metric_stage(stage, time.time() - start)
+
+    def metric_stage(self, stage, duration, service_name=None):
+        """Report the duration in seconds of a lifecycle stage, in processes that send metrics."""
+        metrics = get_metric_sender()
+        if metrics is not None:
+            metrics.metric_execution_stage(self.description['name'], self.user_id, stage, duration, service_name)
+
     def is_active(self):
         """
         Returns True if the execution is in the scheduler
@@ -328,17 +606,18 @@ class Service(Base):
     DOCKER_DIE_STATUS = 'dead'
     DOCKER_DESTROY_STATUS = 'destroyed'
 
+    COLUMNS = (('name', 'name'), ('status', 'status'), ('error_message', 'error_message'), ('execution_id', 'execution_id'),
+               ('service_group', 'service_group'), ('docker_id', 'docker_id'), ('docker_status', 'docker_status'), ('essential', 'essential'))
+
     def __init__(self, d, sql_manager):
         super().__init__(d, sql_manager)
 
-        self.name = d['name']
-        self.status = d['status']
-        self.error_message = d['error_message']
-        self.execution_id = d['execution_id']
-        self.description = d['description']
-        self.service_group = d['service_group']
-        self.docker_id = d['docker_id']
-        self.docker_status = d['docker_status']
+        for column, attribute in self.COLUMNS:
+            if column in d:
+                setattr(self, attribute, d[column])
+
+    def _load(self):
+        return self.sql_manager.service_list(only_one=True, id=self.id)
 
     def serialize(self):
         """Generates a dictionary that can be serialized in JSON."""
@@ -352,12 +631,18 @@ class Service(Base):
             'service_group': self.service_group,
             'docker_id': self.docker_id,
             'ip_address': self.ip_address,
-            'docker_status': self.docker_status
+            'docker_status': self.docker_status,
+            'essential': self.essential
         }
 
     def __eq__(self, other):
         return self.id == other.id
 
+    @property
+    def description(self):
+        """Getter for the service description, shared by all the services of the same group."""
+        return self.sql_manager.service_description(self.execution_id, self.service_group)
+
     @property
     def dns_name(self):
         """Getter for the DNS name of this service as it will be registered in Docker's DNS."""
@@ -396,5 +681,5 @@ class Service(Base):
     @property
     def user_id(self):
         """Getter for the user_id, that is actually taken form the parent execution."""
-        execution = self.sql_manager.execution_list(only_one=True, id=self.execution_id)
+        execution = self.sql_manager.execution_list(only_one=True, fields=['user_id'], id=self.execution_id)
         return execution.user_id
@@ -0,0 +1,29 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Selection of the backend that keeps the Zoe state."""
+
+from argparse import Namespace
+
+from zoe_lib.memory_state import MemoryStateManager
+from zoe_lib.sql_manager import SQLManager
+
+
+def state_manager(conf: Namespace):
+    """Create the state manager selected by the state-backend option."""
+    if conf.state_backend == 'memory':
+        return MemoryStateManager(conf)
+    else:
+        return SQLManager(conf)
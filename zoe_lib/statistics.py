@@ -40,3 +40,49 @@ class ZoeStatisticsAPI(ZoeAPIBase):
             raise ZoeAPIException(data['message'])
         else:
             return data
+
+    def swarm(self):
+        """
+        Queries Zoe for the Swarm cluster status, as cached by the master.
+
+        :return:
+        """
+        data, status_code = self._rest_get('/statistics/swarm')
+        if status_code != 200:
+            raise ZoeAPIException(data['message'])
+        else:
+            return data
+
+    def profile_start(self, process, duration):
+        """
+        Starts profiling the master or the api process for some seconds. Needs the admin role.
+
+        :return:
+        """
+        data, status_code = self._rest_post('/profile/' + process, {'duration': duration})
+        if status_code != 202:
+            raise ZoeAPIException(data['message'])
+
+    def profile_result(self, process):
+        """
+        Retrieves the results of the last profile of the master or the api process. Needs the admin role.
+
+        :return:
+        """
+        data, status_code = self._rest_get('/profile/' + process)
+        if status_code != 200:
+            raise ZoeAPIException(data['message'])
+        else:
+            return data
+
+    def thread_stacks(self, process):
+        """
+        Retrieves the current stack of all the threads of the master or the api process. Needs the admin role.
+
+        :return:
+        """
+        data, status_code = self._rest_get('/profile/' + process + '/stacks')
+        if status_code != 200:
+            raise ZoeAPIException(data['message'])
+        else:
+            return data
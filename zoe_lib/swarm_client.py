@@ -35,6 +35,8 @@ import requests.packages
 
 from zoe_master.stats import SwarmStats, SwarmNodeStats
 from zoe_lib.exceptions import ZoeLibException
+from zoe_lib.fake_swarm import get_fake_docker_client
+from zoe_lib.tracing import traced_call
 
 log = logging.getLogger(__name__)
 
@@ -121,11 +123,28 @@ def zookeeper_swarm(zk_server_list: str, path='/docker') -> str:
     return master.decode('utf-8')
 
 
+class _TracedDockerClient:
+    """Records each Docker API call as a span of the current trace."""
+    LOCAL_CALLS = ('create_host_config',)  # do not talk to Docker
+
+    def __init__(self, cli) -> None:
+        self._cli = cli
+
+    def __getattr__(self, name):
+        attr = getattr(self._cli, name)
+        if callable(attr) and name not in self.LOCAL_CALLS:
+            return traced_call('docker ', attr)
+        return attr
+
+
 class SwarmClient:
     """The Swarm client class that wraps the Docker API."""
     def __init__(self, opts: Namespace) -> None:
         self.opts = opts
         url = opts.swarm
+        if url.startswith('fake://'):
+            self.cli = _TracedDockerClient(get_fake_docker_client(url))
+            return
         if 'zk://' in url:
             url = url[len('zk://'):]
             manager = zookeeper_swarm(url)
@@ -134,7 +153,7 @@ class SwarmClient:
         else:
             raise ZoeLibException('Unsupported URL scheme for Swarm')
         log.debug('Connecting to Swarm at {}'.format(manager))
-        self.cli = docker.Client(base_url=manager)
+        self.cli = _TracedDockerClient(docker.Client(base_url=manager))
 
     def info(self) -> SwarmStats:
         """Retrieve Swarm statistics. The Docker API returns a mess difficult to parse."""
@@ -188,8 +207,14 @@ class SwarmClient:
         pl_status.timestamp = time.time()
         return pl_status
 
-    def spawn_container(self, image: str, options: DockerContainerOptions) -> Dict[str, Any]:
-        """Create and start a new container."""
+    def spawn_container(self, image: str, options: DockerContainerOptions, timings: Dict[str, float]=None) -> Dict[str, Any]:
+        """
+        Create and start a new container.
+
+        :param timings: if given, filled with the seconds spent in the create, start and inspect Docker calls
+        """
+        if timings is None:
+            timings = {}
         cont = None
         port_bindings = {}  # type: Dict[str, Any]
         for port in options.ports:
@@ -211,6 +236,7 @@ class SwarmClient:
                                                       restart_policy=options.restart_policy,
                                                       port_bindings=port_bindings,
                                                       log_config=log_config)
+            time_start = time.time()
             cont = self.cli.create_container(image=image,
                                              environment=options.environment,
                                              network_disabled=False,
@@ -222,13 +248,18 @@ class SwarmClient:
                                              command=options.get_command(),
                                              ports=options.ports,
                                              labels=options.labels)
+            timings['create'] = time.time() - time_start
+            time_start = time.time()
             self.cli.start(container=cont.get('Id'))
+            timings['start'] = time.time() - time_start
         except Exception as e:
             if cont is not None:
                 self.cli.remove_container(container=cont.get('Id'), force=True)
             raise ZoeLibException(str(e))
 
+        time_start = time.time()
         info = self.inspect_container(cont.get('Id'))
+        timings['inspect'] = time.time() - time_start
         return info
 
     def inspect_container(self, docker_id: str) -> Dict[str, Any]:
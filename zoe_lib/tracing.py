@@ -0,0 +1,154 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Request tracing.
+
+A trace ID is created for each REST API request and follows it through the ZeroMQ API, the master and the
+scheduler. Code that runs on behalf of a request records timed spans (database queries, Docker calls, ...)
+tagged with the trace ID of the thread. The trace-output option selects where spans go: a file with one JSON
+object per line, or the metrics sender. Spans are recorded only while a trace ID is set and an output is
+configured, in all other cases span() does nothing.
+"""
+
+import contextlib
+import json
+import logging
+import threading
+import time
+import uuid
+
+from zoe_lib.config import get_conf
+from zoe_lib.metrics.base import get_metric_sender
+
+log = logging.getLogger(__name__)
+
+_LOCAL = threading.local()
+_EXPORTER = None
+_EXPORTER_LOCK = threading.Lock()
+_NOT_CONFIGURED = object()
+
+
+class FileSpanExporter:
+    """Appends spans to a file, one JSON object per line."""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', buffering=1)
+
+    def export(self, trace_id, name, start, duration, tags):
+        """Write a span."""
+        line = json.dumps({
+            'trace_id': trace_id,
+            'span': name,
+            'start': start,
+            'duration_ms': round(duration * 1000, 3),
+            'thread': threading.current_thread().name,
+            'tags': tags
+        }, default=str)
+        with self.lock:
+            self.file.write(line + '\n')
+
+
+class MetricsSpanExporter:
+    """Passes spans to the metrics sender of the process, if there is one."""
+    @staticmethod
+    def export(trace_id, name, start, duration, tags):
+        """Send a span."""
+        sender = get_metric_sender()
+        if sender is not None:
+            sender.metric_trace_span(trace_id, name, start, duration, tags)
+
+
+def _get_exporter():
+    global _EXPORTER
+    if _EXPORTER is None:
+        with _EXPORTER_LOCK:
+            if _EXPORTER is None:
+                _EXPORTER = _create_exporter()
+    return None if _EXPORTER is _NOT_CONFIGURED else _EXPORTER
+
+
+def _create_exporter():
+    conf = get_conf()
+    output = getattr(conf, 'trace_output', '') if conf is not None else ''
+    if output == '':
+        return _NOT_CONFIGURED
+    elif output == 'metrics':
+        return MetricsSpanExporter()
+    try:
+        return FileSpanExporter(output)
+    except OSError as e:
+        log.error('Cannot open the trace file {}, tracing disabled: {}'.format(output, e))
+        return _NOT_CONFIGURED
+
+
+def new_trace_id() -> str:
+    """Generate a new trace ID."""
+    return uuid.uuid4().hex[:16]
+
+
+def current_trace_id():
+    """The trace ID of the calling thread, None if it is not working on a traced request."""
+    return getattr(_LOCAL, 'trace_id', None)
+
+
+@contextlib.contextmanager
+def trace_context(trace_id):
+    """Set the trace ID of the calling thread for the duration of the block. A None trace ID disables tracing in the block."""
+    previous = current_trace_id()
+    _LOCAL.trace_id = trace_id
+    try:
+        yield trace_id
+    finally:
+        _LOCAL.trace_id = previous
+
+
+@contextlib.contextmanager
+def span(name, **tags):
+    """Record the duration of the block as a span of the current trace."""
+    trace_id = current_trace_id()
+    exporter = _get_exporter() if trace_id is not None else None
+    if exporter is None:
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    finally:
+        try:
+            exporter.export(trace_id, name, start, time.time() - start, tags)
+        except Exception:
+            log.exception('Error exporting span {}'.format(name))
+
+
+def traced_call(prefix, function):
+    """Wrap a function so that each call is recorded as a span named after it."""
+    def wrapper(*args, **kwargs):
+        """The wrapped function."""
+        with span(prefix + function.__name__):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def with_current_trace(function):
+    """Wrap a function that will run in another thread, so that it runs with the trace ID of the calling thread."""
+    trace_id = current_trace_id()
+
+    def wrapper(*args, **kwargs):
+        """The wrapped function."""
+        with trace_context(trace_id):
+            return function(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,58 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""EASY backfilling: let small executions jump ahead of a blocked queue head without delaying it."""
+
+from typing import Iterable, Tuple, Union
+
+NEVER = float('inf')
+
+
+def shadow_time(free_memory: int, head_memory: int, running: Iterable[Tuple[float, int]]) -> Tuple[float, int]:
+    """
+    Compute when the blocked head of the queue is expected to start and how much memory it will leave unused.
+
+    :param free_memory: memory free in the cluster now
+    :param head_memory: memory needed by the head of the queue
+    :param running: (expected end time, reserved memory) for each running execution, NEVER if unknown
+    :return: the shadow time and the extra memory that will still be free when the head starts
+    """
+    available = free_memory
+    for end_time, memory in sorted(running, key=lambda x: x[0]):
+        available += memory
+        if available >= head_memory:
+            return end_time, available - head_memory
+    return NEVER, 0
+
+
+def can_backfill(now: float, runtime: Union[float, None], memory: int, shadow: float, extra: int) -> Tuple[bool, int]:
+    """
+    Decide if a candidate that fits in the free memory can start now without delaying the head of the queue.
+
+    A candidate can start if it is expected to terminate before the shadow time, or if it uses only memory that
+    the head of the queue will not need.
+
+    :param now: current time
+    :param runtime: expected run time of the candidate, None if unknown
+    :param memory: memory needed by the candidate
+    :param shadow: shadow time, from shadow_time()
+    :param extra: extra memory, from shadow_time()
+    :return: the decision and the extra memory left after starting the candidate
+    """
+    if runtime is not None and now + runtime <= shadow:
+        return True, extra
+    if memory <= extra:
+        return True, extra - memory
+    return False, extra
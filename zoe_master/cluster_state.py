@@ -0,0 +1,88 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-memory copy of the Swarm cluster status, kept up to date in the background."""
+
+import logging
+import threading
+import time
+
+from zoe_lib.config import get_conf
+from zoe_lib.swarm_client import SwarmClient
+
+from zoe_master.stats import SwarmStats
+
+log = logging.getLogger(__name__)
+
+
+class ZoeClusterState(threading.Thread):
+    """
+    Keeps the last SwarmStats snapshot in memory.
+
+    The snapshot is refreshed every cluster-state-interval seconds and whenever trigger() is called, for example
+    on container events. Bursts of triggers are coalesced into a single refresh. Listeners are called after
+    each successful refresh.
+    """
+
+    MIN_REFRESH_INTERVAL = 1  # seconds between two refreshes caused by triggers
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.setName('cluster_state')
+        self.setDaemon(True)
+        self.interval = get_conf().cluster_state_interval
+        self._stats = None  # type: SwarmStats
+        self._refresh_event = threading.Event()
+        self._listeners = []
+        self.stop = False
+
+        self.start()
+
+    def run(self):
+        """The thread loop."""
+        log.info("Cluster state thread started")
+        while not self.stop:
+            try:
+                self.refresh()
+            except Exception:
+                log.exception('Error retrieving the Swarm status')
+            else:
+                for listener in self._listeners:
+                    listener()
+            self._refresh_event.wait(self.interval)
+            self._refresh_event.clear()
+            time.sleep(self.MIN_REFRESH_INTERVAL)
+
+    def refresh(self) -> None:
+        """Query Swarm and replace the in-memory snapshot."""
+        swarm = SwarmClient(get_conf())
+        self._stats = swarm.info()
+
+    def trigger(self) -> None:
+        """Ask for a refresh as soon as possible."""
+        self._refresh_event.set()
+
+    def add_listener(self, callback) -> None:
+        """Call the callback, without arguments, every time a new snapshot is available."""
+        self._listeners.append(callback)
+
+    def get(self) -> SwarmStats:
+        """Return the last snapshot, None if Swarm has never been reached."""
+        return self._stats
+
+    def quit(self):
+        """Stops the thread."""
+        self.stop = True
+        self._refresh_event.set()
@@ -19,15 +19,21 @@
 
 import logging
 
+from zoe_master.exceptions import ZoeException
 from zoe_master.master_api import APIManager
+from zoe_master.cluster_state import ZoeClusterState
+from zoe_master.runtime_estimator import ZoeRuntimeEstimator
 from zoe_master.scheduler import ZoeScheduler
 from zoe_master.execution_manager import restart_resubmit_scheduler
 from zoe_master.monitor import ZoeMonitor
+from zoe_master.orphan_collector import ZoeOrphanCollector
 
 import zoe_lib.config as config
+from zoe_lib.metrics.base import set_metric_sender
 from zoe_lib.metrics.influxdb import InfluxDBMetricSender
 from zoe_lib.metrics.logging import LogMetricSender
-from zoe_lib.sql_manager import SQLManager
+from zoe_lib.metrics.prometheus import PrometheusListener
+from zoe_lib.state import state_manager
 
 log = logging.getLogger("main")
 LOG_FORMAT = '%(asctime)-15s %(levelname)s %(threadName)s->%(name)s: %(message)s'
@@ -50,19 +56,37 @@ def main():
         metrics = InfluxDBMetricSender(config.get_conf().deployment_name, config.get_conf().influxdb_url, config.get_conf().influxdb_dbname)
     else:
         metrics = LogMetricSender(config.get_conf().deployment_name)
+    set_metric_sender(metrics)
 
-    log.info("Initializing DB manager")
-    state = SQLManager(args)
+    if args.metrics_listen_port > 0:
+        prometheus = PrometheusListener(args.metrics_listen_address, args.metrics_listen_port)
+    else:
+        prometheus = None
+
+    log.info("Initializing state manager ({})".format(args.state_backend))
+    state = state_manager(args)
+
+    cluster_state = ZoeClusterState()
 
     log.info("Initializing scheduler")
-    scheduler = ZoeScheduler()
+    try:
+        scheduler = ZoeScheduler(cluster_state, ZoeRuntimeEstimator(state))
+    except ZoeException as e:  # invalid scheduler options
+        log.error('Cannot start the scheduler: {}'.format(e.message))
+        cluster_state.quit()
+        metrics.quit()
+        if prometheus is not None:
+            prometheus.quit()
+        return 1
+
+    monitor = ZoeMonitor(state, cluster_state)
 
-    monitor = ZoeMonitor(state)
+    orphan_collector = ZoeOrphanCollector(state, metrics)
 
     restart_resubmit_scheduler(state, scheduler)
 
     log.info("Starting ZMQ API server...")
-    api_server = APIManager(metrics, scheduler, state)
+    api_server = APIManager(metrics, scheduler, state, cluster_state)
 
     try:
         api_server.loop()
@@ -73,5 +97,9 @@ def main():
     finally:
         scheduler.quit()
         monitor.quit()
+        cluster_state.quit()
+        orphan_collector.quit()
         api_server.quit()
         metrics.quit()
+        if prometheus is not None:
+            prometheus.quit()
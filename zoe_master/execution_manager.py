@@ -16,6 +16,7 @@
 """Layer in front of the scheduler to perform """
 
 import logging
+import time
 
 from zoe_lib.sql_manager import Execution, SQLManager
 from zoe_master.scheduler import ZoeScheduler
@@ -24,10 +25,15 @@ log = logging.getLogger(__name__)
 
 
 def _digest_application_description(state: SQLManager, execution: Execution):
+    """Create the service instances of an execution, the first essential_count of each group are essential."""
+    time_start = time.time()
+    services = []
     for service_descr in execution.description['services']:
         for counter in range(service_descr['total_count']):
             name = "{}{}".format(service_descr['name'], counter)
-            state.service_new(execution.id, name, service_descr['name'], service_descr)
+            services.append((name, service_descr['name'], service_descr, counter < service_descr['essential_count']))
+    state.services_new(execution.id, services)
+    execution.metric_stage('digest', time.time() - time_start)
 
 
 def execution_submit(state: SQLManager, scheduler: ZoeScheduler, execution: Execution):
@@ -56,6 +62,10 @@ def restart_resubmit_scheduler(state: SQLManager, scheduler: ZoeScheduler):
         scheduler.terminate(e)
         scheduler.incoming(e)
 
+    running_execs = state.execution_list(status=Execution.RUNNING_STATUS)
+    for e in running_execs:
+        scheduler.running(e)
+
 
 def execution_delete(scheduler: ZoeScheduler, execution: Execution):
     """Remove an execution from the scheduler, must only be called if the execution is NOT running."""
@@ -21,10 +21,13 @@ import time
 import zmq
 
 import zoe_lib.config as config
+import zoe_lib.profiling as profiling
 from zoe_lib.metrics.base import BaseMetricSender
-from zoe_lib.sql_manager import SQLManager
+from zoe_lib.sql_manager import SQLManager, query_stats
+from zoe_lib.tracing import span, trace_context
 
 import zoe_master.execution_manager
+from zoe_master.cluster_state import ZoeClusterState
 from zoe_master.exceptions import ZoeException
 from zoe_master.scheduler import ZoeScheduler
 
@@ -33,7 +36,7 @@ log = logging.getLogger(__name__)
 
 class APIManager:
     """The API Manager."""
-    def __init__(self, metrics: BaseMetricSender, scheduler: ZoeScheduler, state: SQLManager) -> None:
+    def __init__(self, metrics: BaseMetricSender, scheduler: ZoeScheduler, state: SQLManager, cluster_state: ZoeClusterState) -> None:
         self.context = zmq.Context()
         self.zmq_s = self.context.socket(zmq.REP)
         self.listen_uri = config.get_conf().api_listen_uri
@@ -42,6 +45,7 @@ class APIManager:
         self.metrics = metrics
         self.scheduler = scheduler
         self.state = state
+        self.cluster_state = cluster_state
 
     def _reply_error(self, message: str) -> None:
         self.zmq_s.send_json({'result': 'error', 'message': message})
@@ -62,40 +66,60 @@ class APIManager:
             message = self.zmq_s.recv_json()
             self.debug_has_replied = False
             start_time = time.time()
-            if message['command'] == 'execution_start':
-                exec_id = message['exec_id']
-                execution = self.state.execution_list(id=exec_id, only_one=True)
-                if execution is None:
-                    self._reply_error('Execution ID {} not found'.format(message['exec_id']))
-                else:
-                    execution.set_scheduled()
+            with trace_context(message.get('trace_id')), span('master ' + message['command']), query_stats('master ' + message['command']):
+                if message['command'] == 'execution_start':
+                    exec_id = message['exec_id']
+                    execution = self.state.execution_list(id=exec_id, only_one=True)
+                    if execution is None:
+                        self._reply_error('Execution ID {} not found'.format(message['exec_id']))
+                    else:
+                        execution.set_scheduled()
+                        self._reply_ok()
+                        zoe_master.execution_manager.execution_submit(self.state, self.scheduler, execution)
+                elif message['command'] == 'execution_terminate':
+                    exec_id = message['exec_id']
+                    execution = self.state.execution_list(id=exec_id, only_one=True)
+                    if execution is None:
+                        self._reply_error('Execution ID {} not found'.format(message['exec_id']))
+                    else:
+                        execution.set_cleaning_up()
+                        self._reply_ok()
+                        zoe_master.execution_manager.execution_terminate(self.scheduler, execution)
+                elif message['command'] == 'execution_delete':
+                    exec_id = message['exec_id']
+                    execution = self.state.execution_list(id=exec_id, only_one=True)
+                    if execution is not None:
+                        zoe_master.execution_manager.execution_delete(self.scheduler, execution)
                     self._reply_ok()
-                    zoe_master.execution_manager.execution_submit(self.state, self.scheduler, execution)
-            elif message['command'] == 'execution_terminate':
-                exec_id = message['exec_id']
-                execution = self.state.execution_list(id=exec_id, only_one=True)
-                if execution is None:
-                    self._reply_error('Execution ID {} not found'.format(message['exec_id']))
+                elif message['command'] == 'scheduler_stats':
+                    data = self.scheduler.stats()
+                    self._reply_ok(data=data)
+                elif message['command'] == 'swarm_stats':
+                    swarm_stats = self.cluster_state.get()
+                    if swarm_stats is None:
+                        self._reply_error('Swarm status not yet available')
+                    else:
+                        self._reply_ok(data=swarm_stats.serialize())
+                elif message['command'] == 'profile_start':
+                    if profiling.profile_start(float(message['duration'])):
+                        self._reply_ok()
+                    else:
+                        self._reply_error('A profile is already running')
+                elif message['command'] == 'profile_result':
+                    result = profiling.profile_result()
+                    if result is None:
+                        self._reply_error('No profile has been started')
+                    else:
+                        self._reply_ok(data=result)
+                elif message['command'] == 'thread_stacks':
+                    self._reply_ok(data=profiling.thread_stacks())
                 else:
-                    execution.set_cleaning_up()
-                    self._reply_ok()
-                    zoe_master.execution_manager.execution_terminate(self.scheduler, execution)
-            elif message['command'] == 'execution_delete':
-                exec_id = message['exec_id']
-                execution = self.state.execution_list(id=exec_id, only_one=True)
-                if execution is not None:
-                    zoe_master.execution_manager.execution_delete(self.scheduler, execution)
-                self._reply_ok()
-            elif message['command'] == 'scheduler_stats':
-                data = self.scheduler.stats()
-                self._reply_ok(data=data)
-            else:
-                log.error('Unknown command: {}'.format(message['command']))
-                self._reply_error('unknown command')
+                    log.error('Unknown command: {}'.format(message['command']))
+                    self._reply_error('unknown command')
 
-            if not self.debug_has_replied:
-                self._reply_error('bug')
-                raise ZoeException('BUG: command {} does not fill a reply')
+                if not self.debug_has_replied:
+                    self._reply_error('bug')
+                    raise ZoeException('BUG: command {} does not fill a reply')
 
             self.metrics.metric_api_call(start_time, message['command'])
 
@@ -21,19 +21,25 @@ import time
 
 from zoe_lib.swarm_client import SwarmClient
 from zoe_lib.config import get_conf
+from zoe_lib.metrics.registry import get_registry
 from zoe_lib.sql_manager import SQLManager
 
+from zoe_master.cluster_state import ZoeClusterState
+
 log = logging.getLogger(__name__)
 
 
 class ZoeMonitor(threading.Thread):
     """The monitor."""
 
-    def __init__(self, state: SQLManager) -> None:
+    def __init__(self, state: SQLManager, cluster_state: ZoeClusterState) -> None:
         super().__init__()
         self.setName('monitor')
         self.stop = False
         self.state = state
+        self.cluster_state = cluster_state
+        self.event_counters = {}  # event type -> counter
+        self.event_lag = get_registry().gauge('monitor_event_lag_seconds')
         self.setDaemon(True)
 
         self.start()
@@ -50,6 +56,12 @@ class ZoeMonitor(threading.Thread):
             time.sleep(1)  # Usually we got disconnected, so wait a bit before retrying
 
     def _event_cb(self, event: dict) -> bool:
+        if event['Type'] not in self.event_counters:
+            self.event_counters[event['Type']] = get_registry().counter('swarm_events', type=event['Type'])
+        self.event_counters[event['Type']].inc()
+        if 'timeNano' in event:
+            self.event_lag.set(time.time() - event['timeNano'] / 1e9)
+
         if event['Type'] == 'container':
             self._container_event(event)
         elif event['Type'] == 'network':
@@ -66,13 +78,16 @@ class ZoeMonitor(threading.Thread):
             return True
 
     def _container_event(self, event: dict):
+        if event['Action'] in ('create', 'start', 'die', 'destroy'):  # reservations in Swarm have changed
+            self.cluster_state.trigger()
+
         if 'zoe.deployment_name' not in event['Actor']['Attributes']:
             return
         if event['Actor']['Attributes']['zoe.deployment_name'] != get_conf().deployment_name:
             return
 
         service_id = event['Actor']['Attributes']['zoe.service.id']  # type: int
-        service = self.state.service_list(only_one=True, id=service_id)
+        service = self.state.service_list(only_one=True, fields=['docker_status'], id=service_id)
         if 'exec' in event['Action']:
             pass
         elif 'create' in event['Action']:
@@ -0,0 +1,87 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Garbage collector for containers left in Swarm without a matching service in the state."""
+
+import logging
+import threading
+
+from zoe_lib.config import get_conf
+from zoe_lib.metrics.base import BaseMetricSender
+from zoe_lib.sql_manager import SQLManager
+from zoe_lib.swarm_client import SwarmClient
+
+log = logging.getLogger(__name__)
+
+
+class ZoeOrphanCollector(threading.Thread):
+    """
+    Periodically compares the containers labeled for this deployment with the docker IDs known to the state.
+
+    A container is removed only if it is found orphaned in two consecutive passes, so that containers being
+    created right now, before their docker ID is saved in the state, are left alone.
+    """
+
+    def __init__(self, state: SQLManager, metrics: BaseMetricSender) -> None:
+        super().__init__()
+        self.setName('orphan_collector')
+        self.setDaemon(True)
+        self.state = state
+        self.metrics = metrics
+        self.interval = get_conf().orphan_gc_interval
+        self.dry_run = get_conf().orphan_gc_dry_run
+        self.stop = threading.Event()
+        self.candidates = set()
+
+        if self.interval > 0:
+            self.start()
+        else:
+            log.info('Orphan container collector is disabled')
+
+    def run(self):
+        """The thread loop."""
+        log.info("Orphan container collector started (interval {}s, dry run: {})".format(self.interval, self.dry_run))
+        while not self.stop.wait(self.interval):
+            try:
+                self.collect()
+            except Exception:
+                log.exception('Exception in orphan container collector')
+
+    def collect(self) -> None:
+        """Run one reconciliation pass."""
+        swarm = SwarmClient(get_conf())
+        containers = swarm.list(only_label={'zoe.deployment_name': get_conf().deployment_name})
+        known_ids = self.state.service_docker_ids()
+
+        orphans = set()
+        for cont in containers:
+            if cont['id'] not in known_ids:
+                orphans.add(cont['id'])
+
+        to_remove = orphans & self.candidates
+        self.candidates = orphans
+
+        for docker_id in to_remove:
+            if self.dry_run:
+                log.warning('Orphan container {} found, not removing it (dry run)'.format(docker_id))
+            else:
+                log.warning('Orphan container {} found, removing it'.format(docker_id))
+                swarm.terminate_container(docker_id, delete=True)
+
+        self.metrics.metric_orphan_gc(len(containers), len(orphans), 0 if self.dry_run else len(to_remove))
+
+    def quit(self):
+        """Stops the thread."""
+        self.stop.set()
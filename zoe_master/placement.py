@@ -0,0 +1,77 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Node-level placement of services, decided by Zoe instead of the Swarm strategy."""
+
+import logging
+from typing import List, Union
+
+from zoe_master.stats import SwarmStats
+
+log = logging.getLogger(__name__)
+
+
+class ZoePlacement:
+    """
+    Chooses the Swarm node for each service and keeps track of the memory still free on each node.
+
+    Works on a copy of the free memory of each node, taken from a SwarmStats snapshot, that is updated after each
+    decision so that the following services see the reservations of the previous ones, until a new snapshot
+    is available.
+
+    The binpack policy chooses the node with the least free memory that can host the service, preferring nodes
+    that already host services of the same execution. The spread policy chooses the node with the most free memory.
+    With the swarm policy node choices are only used for accounting and no constraint is given to Swarm.
+    """
+    def __init__(self, swarm_stats: SwarmStats, policy: str) -> None:
+        assert policy in ('swarm', 'binpack', 'spread')
+        self.policy = policy
+        self.timestamp = swarm_stats.timestamp
+        self.free_memory = {}
+        self.used_nodes = {}
+        for node in swarm_stats.nodes:
+            if node.status is not None and node.status != 'Healthy':
+                continue
+            self.free_memory[node.name] = node.memory_total - node.memory_reserved
+
+    def choose_node(self, memory: int, execution_id: int) -> Union[str, None]:
+        """Return the name of the node that should host a service needing this amount of memory, None if no node fits."""
+        chosen = self._choose(self.free_memory, memory, self.used_nodes.get(execution_id, set()))
+        if chosen is None:
+            return None
+
+        self.free_memory[chosen] -= memory
+        self.used_nodes.setdefault(execution_id, set()).add(chosen)
+        return chosen
+
+    def fits(self, memory_list: List[int]) -> bool:
+        """Check if all the services needing the amounts of memory in the list can be placed, without reserving anything."""
+        free_memory = dict(self.free_memory)
+        for memory in sorted(memory_list, reverse=True):
+            chosen = self._choose(free_memory, memory, set())
+            if chosen is None:
+                return False
+            free_memory[chosen] -= memory
+        return True
+
+    def _choose(self, free_memory, memory, used_nodes):
+        candidates = [name for name, free in free_memory.items() if free >= memory]
+        if len(candidates) == 0:
+            return None
+
+        if self.policy == 'spread':
+            return max(candidates, key=lambda name: free_memory[name])
+        else:
+            return min(candidates, key=lambda name: (name not in used_nodes, free_memory[name]))
@@ -0,0 +1,80 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Delayed retries of executions that failed to start for a temporary reason."""
+
+import logging
+import math
+import threading
+
+log = logging.getLogger(__name__)
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff: the delay in seconds before the given retry attempt (starting from 1)."""
+    return min(base_delay * 2 ** (attempt - 1), max_delay)
+
+
+class ZoeRetryTimer(threading.Thread):
+    """
+    A hashed timer wheel with a resolution of one second.
+
+    Callbacks are kept in the slot of the wheel in which they expire, together with the number of complete turns
+    of the wheel still to wait. Each tick only looks at one slot, so the cost does not depend on the number
+    of pending retries. Callbacks run in the timer thread and should be short.
+    """
+
+    WHEEL_SIZE = 64
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.setName('retry_timer')
+        self.setDaemon(True)
+        self.wheel = [[] for _ in range(self.WHEEL_SIZE)]
+        self.current = 0
+        self.count = 0
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+
+        self.start()
+
+    def schedule(self, delay: float, callback) -> None:
+        """Call the callback after delay seconds, rounded up to the next tick."""
+        ticks = max(1, int(math.ceil(delay)))
+        with self.lock:
+            slot = (self.current + ticks) % self.WHEEL_SIZE
+            self.wheel[slot].append(((ticks - 1) // self.WHEEL_SIZE, callback))
+            self.count += 1
+
+    def run(self):
+        """The thread loop."""
+        while not self.stop.wait(1):
+            with self.lock:
+                self.current = (self.current + 1) % self.WHEEL_SIZE
+                expired = [callback for rounds, callback in self.wheel[self.current] if rounds == 0]
+                self.wheel[self.current] = [(rounds - 1, callback) for rounds, callback in self.wheel[self.current] if rounds > 0]
+                self.count -= len(expired)
+            for callback in expired:
+                try:
+                    callback()
+                except Exception:
+                    log.exception('Exception in retry callback')
+
+    def __len__(self):
+        return self.count
+
+    def quit(self):
+        """Stops the thread."""
+        self.stop.set()
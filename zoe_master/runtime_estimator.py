@@ -0,0 +1,49 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Run time estimates for executions, based on the history kept in the state."""
+
+import logging
+import time
+from typing import Union
+
+from zoe_lib.sql_manager import Execution, SQLManager
+
+log = logging.getLogger(__name__)
+
+
+class ZoeRuntimeEstimator:
+    """Estimates how long an execution will run as the average run time of the terminated executions of the same ZApp."""
+
+    REFRESH_INTERVAL = 300  # seconds between two reloads of the history from the state
+
+    def __init__(self, state: SQLManager) -> None:
+        self.state = state
+        self._averages = {}
+        self._last_refresh = 0
+
+    def estimate(self, execution: Execution) -> Union[float, None]:
+        """Expected run time in seconds, None if no execution of the same ZApp has ever terminated."""
+        if time.time() - self._last_refresh > self.REFRESH_INTERVAL:
+            self.refresh()
+        return self._averages.get(execution.description['name'])
+
+    def refresh(self) -> None:
+        """Reload the run time history from the state."""
+        self._last_refresh = time.time()
+        try:
+            self._averages = self.state.execution_runtime_averages()
+        except Exception:
+            log.exception('Cannot load the execution run time history')
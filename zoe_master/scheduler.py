@@ -15,39 +15,162 @@
 
 """The Scheduler."""
 
+import collections
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import threading
+import time
 
-from zoe_lib.sql_manager import Execution
+from zoe_lib.config import get_conf
+from zoe_lib.metrics.registry import get_registry
+from zoe_lib.sql_manager import Execution, Service, query_stats
+from zoe_lib.swarm_client import SwarmClient
+from zoe_lib.tracing import current_trace_id, span, trace_context, with_current_trace
 
+import zoe_master.backfill as backfill
+from zoe_master.cluster_state import ZoeClusterState
+from zoe_master.placement import ZoePlacement
+from zoe_master.retry_timer import ZoeRetryTimer, backoff_delay
+from zoe_master.runtime_estimator import ZoeRuntimeEstimator
+from zoe_master.scheduler_policies.fair_share import FairSharePolicy, parse_weights
+from zoe_master.scheduler_policies.fifo import FIFOPolicy
+from zoe_master.scheduler_policies.size_based import SizeBasedPolicy
 from zoe_master.exceptions import ZoeStartExecutionFatalException, ZoeStartExecutionRetryException
-from zoe_master.zapp_to_docker import execution_to_containers, terminate_execution
+from zoe_master.zapp_to_docker import execution_to_containers, service_to_container, terminate_execution
 
 log = logging.getLogger(__name__)
 
 
+def _priority(execution: Execution) -> int:
+    """The priority of an execution, the validation of ZApp descriptions accepts it also as a string."""
+    return int(execution.description['priority'])
+
+
 class ZoeScheduler:
-    """The Scheduler class."""
-    def __init__(self):
-        self.fifo_queue = []
-        self.trigger_semaphore = threading.Semaphore(0)
-        self.async_threads = []
+    """
+    The Scheduler class.
+
+    The order in which queued executions are considered is decided by the configured policy (FIFO, SIZE or FAIR).
+    Executions are gang-scheduled: the execution at the head of the queue is started as soon as its essential
+    services fit in the free memory of the cluster. Its elastic services (total_count - essential_count for each
+    service group) are started later, one by one, whenever there is capacity left after the queue has been served.
+
+    If backfilling is enabled, while the head of the queue waits for resources the following executions can start
+    if they fit and are not expected to delay the head (EASY backfilling). Elastic services are subject to the
+    same rule.
+
+    If preemption is enabled, when the head of the queue does not fit, running executions with a priority lower
+    than the preemption threshold and than the priority of the head are terminated and put back in the queue.
+    Lower priorities are preempted first and, among the same priority, the most recently started executions.
+
+    The scheduler thread sleeps until something can change its decisions: a new or resubmitted execution, the end
+    of a termination or a new snapshot of the cluster status, that is refreshed on container events. Each pass
+    starts as many executions as the free resources allow.
+
+    The queue and the accounting of running executions belong to the scheduler thread. The other threads (the API,
+    the retry timer, the termination workers) post their changes as commands, that the scheduler thread applies
+    before each decision, so no lock is needed and the API never waits for a pass to finish.
+
+    Executions that fail to start for a temporary reason are retried after an exponentially growing delay, kept
+    outside the queue by a timer, and moved to the error state when the retry budget is exhausted. Elastic services
+    are retried in the same way and abandoned when the budget is exhausted, the execution keeps running without them.
+    """
+
+    ASYNC_WORKERS = 16  # threads used for terminations and preemptions
+
+    def __init__(self, cluster_state: ZoeClusterState, estimator: ZoeRuntimeEstimator):
+        self.cluster_state = cluster_state
+        self.estimator = estimator
+        if get_conf().scheduler_policy == 'SIZE':
+            self.queue = SizeBasedPolicy(estimator, get_conf().size_aging_time)
+        elif get_conf().scheduler_policy == 'FAIR':
+            self.queue = FairSharePolicy(parse_weights(get_conf().fair_share_weights))
+        else:
+            self.queue = FIFOPolicy()
+        self.running_memory = {}  # execution ID -> (execution, memory reserved by its running services)
+        self.elastic_pending = {}  # execution ID -> (execution, list of elastic services not yet started)
+        self.preempting = {}  # execution ID -> memory that will be freed when its termination completes
+        self.retry_counts = {}  # execution ID -> number of failed start attempts
+        self.retry_waiting = {}  # execution ID -> execution waiting for its retry delay to expire
+        self.service_retry_counts = {}  # (execution ID, service ID) -> number of failed start attempts of an elastic service
+        self.service_retry_waiting = {}  # service ID -> (execution, elastic service) waiting for its retry delay to expire
+        self.service_retry_ready = collections.deque()  # (execution, elastic service) whose retry delay has expired
+        self.retry_timer = ZoeRetryTimer()
+        self.placement = None  # type: ZoePlacement
+        self.trigger_event = threading.Event()
+        self.async_executor = ThreadPoolExecutor(max_workers=self.ASYNC_WORKERS)
+        self.async_futures = set()
+        self.commands = collections.deque()  # (function, args) posted by other threads, run by the scheduler thread
         self.loop_quit = False
         self.loop_th = threading.Thread(target=self.loop_start_th, name='scheduler')
         self.loop_th.start()
+        self.cluster_state.add_listener(self.trigger)
+
+        registry = get_registry()
+        self.executions_started = registry.counter('executions_started')
+        self.start_retries = registry.counter('execution_start_retries')
+        self.start_errors = registry.counter('execution_start_errors')
+        self.preemptions = registry.counter('executions_preempted')
+        registry.gauge('scheduler_queue_length', function=lambda: len(self.queue))
+        registry.gauge('scheduler_async_tasks', function=lambda: len(self.async_futures))
+        registry.gauge('scheduler_retry_waiting', function=lambda: len(self.retry_waiting) + len(self.service_retry_waiting))
 
     def trigger(self):
         """Trigger a scheduler run."""
-        self.trigger_semaphore.release()
+        self.trigger_event.set()
+
+    def _run_async(self, function, name):
+        """Run a termination in the thread pool, the scheduler is triggered when it completes."""
+        def done(future):
+            """Called when the function has returned."""
+            self.async_futures.discard(future)
+            if future.exception() is not None:
+                log.error('Exception in {}: {}'.format(name, future.exception()))
+            self.trigger()
+
+        future = self.async_executor.submit(with_current_trace(function))
+        self.async_futures.add(future)
+        future.add_done_callback(done)
+
+    def _post(self, function, *args):
+        """Have the scheduler thread run a function that changes its state, with the trace ID of the calling thread."""
+        self.commands.append((with_current_trace(function), args))
+        self.trigger()
+
+    def _run_commands(self):
+        """Apply the changes posted by the other threads, in order."""
+        while len(self.commands) > 0:
+            function, args = self.commands.popleft()
+            try:
+                function(*args)
+            except Exception:
+                log.exception('Exception in a scheduler command')
 
     def incoming(self, execution: Execution):
         """
-        This method adds the execution to the end of the FIFO queue and triggers the scheduler.
+        This method adds the execution to the queue and triggers the scheduler.
         :param execution: The execution
         :return:
         """
-        self.fifo_queue.append(execution)
-        self.trigger()
+        if current_trace_id() is not None:
+            execution.trace_id = current_trace_id()
+        self._post(self.queue.add, execution)
+
+    def running(self, execution: Execution):
+        """
+        Inform the scheduler of an execution that is already running, so that its missing elastic services are started.
+        :param execution: The execution
+        :return:
+        """
+        self._post(self._running, execution)
+
+    def _running(self, execution: Execution):
+        services = execution.services
+        self._account(execution, sum([s.description['required_resources']['memory'] for s in services if s.docker_id is not None]))
+        pending = [s for s in services if not s.essential and s.docker_id is None]
+        if len(pending) > 0:
+            self.elastic_pending[execution.id] = (execution, sorted(pending, key=lambda x: x.description['startup_order']))
+            self.trigger()
 
     def terminate(self, execution: Execution) -> None:
         """
@@ -55,85 +178,333 @@ class ZoeScheduler:
         :param execution: the terminated execution
         :return: None
         """
+        self._post(self._terminate, execution)
+
+    def _terminate(self, execution: Execution) -> None:
         def async_termination():
             """Actual termination run in a thread."""
             terminate_execution(execution)
-            self.trigger()
 
-        try:
-            self.fifo_queue.remove(execution)
-        except ValueError:
-            pass
-        th = threading.Thread(target=async_termination, name='termination_{}'.format(execution.id))
-        th.start()
-        self.async_threads.append(th)
+        self.queue.remove(execution)
+        self._account(execution, None)
+        self.elastic_pending.pop(execution.id, None)
+        self.preempting.pop(execution.id, None)  # do not put it back in the queue if it was being preempted
+        self._forget_retries(execution)
+        self._forget_service_retries(execution)
+        self._run_async(async_termination, 'termination_{}'.format(execution.id))
 
     def remove_execution(self, execution: Execution):
         """Removes the execution form the queue."""
-        try:
-            self.fifo_queue.remove(execution)
-        except ValueError:
-            pass
+        self._post(self._remove_execution, execution)
+
+    def _remove_execution(self, execution: Execution):
+        self.queue.remove(execution)
+        self._account(execution, None)
+        self.elastic_pending.pop(execution.id, None)
+        self.preempting.pop(execution.id, None)
+        self._forget_retries(execution)
+        self._forget_service_retries(execution)
 
     def loop_start_th(self):
         """The Scheduler thread loop."""
         while True:
-            ret = self.trigger_semaphore.acquire(timeout=1)
-            if not ret:  # Semaphore timeout, do some thread cleanup
-                counter = len(self.async_threads)
-                while counter > 0:
-                    if len(self.async_threads) == 0:
-                        break
-                    th = self.async_threads.pop(0)
-                    th.join(0.1)
-                    if th.isAlive():  # join failed
-                        log.debug('Thread {} join failed'.format(th.name))
-                        self.async_threads.append(th)
-                    counter -= 1
-                continue
+            self.trigger_event.wait()
+            self.trigger_event.clear()  # triggers received from now on cause another pass
             if self.loop_quit:
                 break
 
             log.debug("Scheduler start loop has been triggered")
-            if len(self.fifo_queue) == 0:
-                continue
+            try:
+                self._schedule_pass()
+            except Exception:
+                log.exception('Exception in the scheduler loop')
+
+    def _schedule_pass(self):
+        """Start all the queued executions and elastic services that can be started now."""
+        self._refresh_placement()
 
-            e = self.fifo_queue[0]
+        extra_memory = None
+        self._run_commands()
+        while len(self.queue) > 0:
+            queue = self.queue.ordered()
+            e = queue[0]
             assert isinstance(e, Execution)
+            if self._fits(self._essential_memory(e)):
+                self._start_execution(e)
+                self._run_commands()  # terminations received while the containers were being created
+                continue
+            log.debug('Execution {} waits for resources'.format(e.id))
+            if self._preempt_for(e):
+                extra_memory = 0  # memory being freed is reserved for the head
+            else:
+                extra_memory = self._backfill(e, queue[1:])
+            break
+
+        self._start_elastic_services(extra_memory)
+
+    def _backfill(self, head: Execution, candidates) -> int:
+        """
+        Start the candidate executions that do not delay the blocked head.
+
+        :return: the memory that can still be used without delaying the head
+        """
+        if not get_conf().backfill:
+            return 0
+
+        now = time.time()
+        running = []
+        for execution, memory in self.running_memory.values():
+            runtime = self.estimator.estimate(execution)
+            if runtime is None or execution.time_start is None:
+                running.append((backfill.NEVER, memory))
+            else:
+                running.append((execution.time_start.timestamp() + runtime, memory))
+        shadow, extra_memory = backfill.shadow_time(sum(self.placement.free_memory.values()), sum(self._essential_memory(head)), running)
+
+        for e in candidates:
+            memory_list = self._essential_memory(e)
+            if not self._fits(memory_list):
+                continue
+            allowed, extra_memory = backfill.can_backfill(now, self.estimator.estimate(e), sum(memory_list), shadow, extra_memory)
+            if allowed:
+                log.info('Backfilling execution {} while execution {} waits for resources'.format(e.id, head.id))
+                self._start_execution(e)
+        return extra_memory
+
+    def _preempt_for(self, head: Execution) -> bool:
+        """
+        Preempt running executions with a lower priority to make room for the blocked head.
+
+        :return: True if preemptions are in progress on behalf of the head
+        """
+        if get_conf().preemption_threshold == 0:
+            return False
+        head_memory = sum(self._essential_memory(head))
+        available = sum(self.placement.free_memory.values()) + sum(self.preempting.values())
+        if available >= head_memory:
+            return len(self.preempting) > 0
+
+        max_priority = min(get_conf().preemption_threshold, _priority(head))
+        victims = [(e, memory) for e, memory in self.running_memory.values() if _priority(e) < max_priority]
+        victims.sort(key=lambda x: (_priority(x[0]), -x[0].time_start.timestamp() if x[0].time_start is not None else 0))
+        chosen = []
+        for e, memory in victims:
+            if available >= head_memory:
+                break
+            chosen.append(e)
+            available += memory
+        if available < head_memory:  # preempting would not be enough
+            return len(self.preempting) > 0
+
+        for e in chosen:
+            log.info('Preempting execution {} (priority {}) to start execution {} (priority {})'.format(e.id, _priority(e), head.id, _priority(head)))
+            self._preempt(e)
+        return True
+
+    def _preempt(self, execution: Execution) -> None:
+        """Terminate a running execution in a thread and put it back in the queue."""
+        def async_preemption():
+            """Actual termination run in a thread."""
+            terminate_execution(execution)
+            self._post(self._requeue_preempted, execution)
+
+        self.preemptions.inc()
+        self.preempting[execution.id] = self.running_memory[execution.id][1]
+        self._account(execution, None)
+        self.elastic_pending.pop(execution.id, None)
+        self._forget_service_retries(execution)
+        self._run_async(async_preemption, 'preemption_{}'.format(execution.id))
+
+    def _requeue_preempted(self, execution: Execution) -> None:
+        """Put back in the queue an execution whose preemption is complete."""
+        if self.preempting.pop(execution.id, None) is not None:  # the user did not terminate it meanwhile
+            execution.set_scheduled()
+            self.queue.add(execution)
+
+    def _start_execution(self, e: Execution):
+        """Start the essential services of an execution in the queue."""
+        with trace_context(e.trace_id), span('start_execution', execution_id=e.id), query_stats('start_execution'):
             e.set_starting()
-            self.fifo_queue.pop(0)  # remove the execution form the queue
+            self.queue.remove(e)  # remove the execution form the queue
 
             try:
-                execution_to_containers(e)
+                execution_to_containers(e, self.placement)
             except ZoeStartExecutionRetryException as ex:
                 log.warning('Temporary failure starting execution {}: {}'.format(e.id, ex.message))
-                e.set_error_message(ex.message)
+                self.start_retries.inc()
                 terminate_execution(e)
-                e.set_scheduled()
-                self.fifo_queue.append(e)
+                self._retry_later(e, ex.message)
             except ZoeStartExecutionFatalException as ex:
                 log.error('Fatal error trying to start execution {}: {}'.format(e.id, ex.message))
+                self.start_errors.inc()
                 e.set_error_message(ex.message)
                 terminate_execution(e)
                 e.set_error()
+                self._forget_retries(e)
             except Exception as ex:
                 log.exception('BUG, this error should have been caught earlier')
+                self.start_errors.inc()
                 e.set_error_message(str(ex))
                 terminate_execution(e)
                 e.set_error()
+                self._forget_retries(e)
             else:
+                self.executions_started.inc()
                 e.set_running()
+                self._forget_retries(e)
+                self._running(e)
+
+    def _retry_later(self, e: Execution, message: str):
+        """Put back in the queue, after a delay, an execution that failed to start, or give up if the retry budget is exhausted."""
+        attempts = self.retry_counts.get(e.id, 0) + 1
+        if attempts > get_conf().start_retry_budget:
+            log.error('Execution {} failed to start {} times, giving up'.format(e.id, attempts))
+            e.set_error_message('{} (giving up after {} attempts)'.format(message, attempts))
+            e.set_error()
+            self._forget_retries(e)
+            return
+
+        delay = backoff_delay(attempts, get_conf().start_retry_delay, get_conf().start_retry_max_delay)
+        log.info('Execution {} will be retried in {} seconds'.format(e.id, delay))
+        e.set_error_message(message)
+        e.set_scheduled()
+        self.retry_counts[e.id] = attempts
+        self.retry_waiting[e.id] = e
+        self.retry_timer.schedule(delay, lambda: self._retry_expired(e))
+
+    def _retry_expired(self, e: Execution):
+        """Called by the retry timer when an execution can be put back in the queue."""
+        if self.retry_waiting.pop(e.id, None) is not None:  # it was not terminated meanwhile
+            self.incoming(e)
+
+    def _forget_retries(self, e: Execution):
+        """Drop the retry state of an execution."""
+        self.retry_counts.pop(e.id, None)
+        self.retry_waiting.pop(e.id, None)
+
+    def _start_elastic_services(self, extra_memory):
+        """
+        Start, in order of arrival, the elastic services that fit in the cluster.
+
+        :param extra_memory: if not None, the memory that can be used without delaying the head of the queue
+        """
+        while len(self.service_retry_ready) > 0:
+            execution, service = self.service_retry_ready.popleft()
+            if execution.id in self.running_memory:  # not terminated or preempted meanwhile
+                pending = self.elastic_pending.setdefault(execution.id, (execution, []))[1]
+                pending.append(service)
+                pending.sort(key=lambda x: x.description['startup_order'])
+
+        for exec_id in list(self.elastic_pending.keys()):
+            if exec_id not in self.elastic_pending:  # terminated meanwhile
+                continue
+            execution, pending = self.elastic_pending[exec_id]
+            while len(pending) > 0 and self._fits([pending[0].description['required_resources']['memory']]):
+                memory = pending[0].description['required_resources']['memory']
+                if extra_memory is not None:
+                    if memory > extra_memory:
+                        break
+                    extra_memory -= memory
+                service = pending.pop(0)
+                try:
+                    service_to_container(execution, service, self.placement)
+                except ZoeStartExecutionRetryException as ex:
+                    log.warning('Temporary failure starting elastic service {}: {}'.format(service.id, ex.message))
+                    self._stop_service(service)
+                    self._retry_service_later(execution, service)
+                    break
+                except Exception as ex:
+                    log.error('Cannot start elastic service {}, giving up: {}'.format(service.id, ex))
+                    self._stop_service(service)
+                    self.service_retry_counts.pop((exec_id, service.id), None)
+                else:
+                    self.service_retry_counts.pop((exec_id, service.id), None)
+                    if exec_id in self.running_memory:
+                        self._account(execution, self.running_memory[exec_id][1] + memory)
+            if len(pending) == 0:
+                self.elastic_pending.pop(exec_id, None)
+
+    def _retry_service_later(self, execution: Execution, service: Service):
+        """Start again, after a delay, an elastic service that failed to start, or give up if the retry budget is exhausted."""
+        key = (execution.id, service.id)
+        attempts = self.service_retry_counts.get(key, 0) + 1
+        if attempts > get_conf().start_retry_budget:
+            log.error('Elastic service {} failed to start {} times, giving up'.format(service.id, attempts))
+            self.service_retry_counts.pop(key, None)
+            return
+
+        delay = backoff_delay(attempts, get_conf().start_retry_delay, get_conf().start_retry_max_delay)
+        log.info('Elastic service {} will be retried in {} seconds'.format(service.id, delay))
+        self.service_retry_counts[key] = attempts
+        self.service_retry_waiting[service.id] = (execution, service)
+        self.retry_timer.schedule(delay, lambda: self._service_retry_expired(service.id))
+
+    def _service_retry_expired(self, service_id):
+        """Called by the retry timer, the service is handed to the scheduler thread that owns the pending lists."""
+        item = self.service_retry_waiting.pop(service_id, None)
+        if item is not None:  # the execution was not terminated meanwhile
+            self.service_retry_ready.append(item)
+            self.trigger()
+
+    def _forget_service_retries(self, execution: Execution):
+        """Drop the retry state of the elastic services of an execution."""
+        for service_id in [sid for sid, (e, service_) in list(self.service_retry_waiting.items()) if e.id == execution.id]:
+            self.service_retry_waiting.pop(service_id, None)
+        for key in [key for key in list(self.service_retry_counts) if key[0] == execution.id]:
+            self.service_retry_counts.pop(key, None)
+
+    def _account(self, execution: Execution, memory):
+        """Record the memory reserved by a running execution, None if it is not running anymore."""
+        old_memory = self.running_memory.pop(execution.id, (None, 0))[1]
+        if memory is not None:
+            self.running_memory[execution.id] = (execution, memory)
+        else:
+            memory = 0
+        self.queue.account(execution, memory - old_memory)
+
+    def _stop_service(self, service: Service):
+        """Clean up a service that failed to start."""
+        if service.docker_id is not None:
+            swarm = SwarmClient(get_conf())
+            swarm.terminate_container(service.docker_id, delete=True)
+        service.set_inactive()
+
+    def _refresh_placement(self):
+        """Build a new placement view if a newer snapshot of the cluster is available."""
+        swarm_stats = self.cluster_state.get()
+        if swarm_stats is None:
+            self.placement = None
+        elif self.placement is None or self.placement.timestamp != swarm_stats.timestamp:
+            self.placement = ZoePlacement(swarm_stats, get_conf().placement_policy)
+
+    def _fits(self, memory_list) -> bool:
+        """Check if services with the given memory reservations can be started now."""
+        if self.placement is None:  # the cluster status is unknown, let Swarm decide
+            return True
+        return self.placement.fits(memory_list)
+
+    @staticmethod
+    def _essential_memory(execution: Execution):
+        """The memory reservations of the essential services of an execution, taken from its description."""
+        memory_list = []
+        for service_descr in execution.description['services']:
+            memory_list += [service_descr['required_resources']['memory']] * service_descr['essential_count']
+        return memory_list
 
     def quit(self):
         """Stop the scheduler thread."""
         self.loop_quit = True
+        self.retry_timer.quit()
         self.trigger()
         self.loop_th.join()
+        self.async_executor.shutdown(wait=False)
 
     def stats(self):
         """Scheduler statistics."""
         return {
-            'queue_length': len(self.fifo_queue),
-            'termination_threads_count': len(self.async_threads)
+            'queue_length': len(self.queue),
+            'termination_threads_count': len(self.async_futures),
+            'elastic_pending_count': sum([len(pending) for execution_, pending in list(self.elastic_pending.values())]),
+            'preemptions_in_progress': len(self.preempting),
+            'retry_waiting_count': len(self.retry_waiting)
         }
-
@@ -0,0 +1,51 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Base class for scheduler policies."""
+
+from typing import List
+
+from zoe_lib.sql_manager import Execution
+
+
+def execution_memory(execution: Execution) -> int:
+    """The memory reserved by all the services of an execution, taken from its description."""
+    return sum([s['required_resources']['memory'] * s['total_count'] for s in execution.description['services']])
+
+
+class ZoeSchedulerPolicyBase:
+    """
+    A scheduler policy holds the executions waiting to be started and decides in which order they are considered.
+
+    The scheduler tries the executions in order: the first one is the head of the queue.
+    """
+    def add(self, execution: Execution) -> None:
+        """Add an execution to the queue."""
+        raise NotImplementedError
+
+    def remove(self, execution: Execution) -> None:
+        """Remove an execution from the queue, if present."""
+        raise NotImplementedError
+
+    def ordered(self) -> List[Execution]:
+        """Return a copy of the queue, in the order in which executions should be started."""
+        raise NotImplementedError
+
+    def account(self, execution: Execution, memory_delta: int) -> None:
+        """Called when the memory reserved by the running services of an execution changes."""
+        pass
+
+    def __len__(self) -> int:
+        raise NotImplementedError
@@ -0,0 +1,104 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-user fair-share scheduler policy."""
+
+import threading
+from typing import Dict, List
+
+from zoe_lib.sql_manager import Execution
+from zoe_master.exceptions import ZoeException
+from zoe_master.scheduler_policies.base import execution_memory
+import zoe_master.scheduler_policies.base
+
+
+def parse_weights(weights: str) -> Dict[str, float]:
+    """Parse a list of shares in the form 'user1:2,user2:0.5'."""
+    ret = {}
+    for item in weights.split(','):
+        if item.strip() == '':
+            continue
+        try:
+            user_id, weight = item.rsplit(':', 1)
+            weight = float(weight)
+        except ValueError:
+            raise ZoeException('Invalid fair-share-weights entry, the format is user:weight: {}'.format(item))
+        if weight <= 0:
+            raise ZoeException('Fair share weights must be positive: {}'.format(item))
+        ret[user_id.strip()] = weight
+    return ret
+
+
+class FairSharePolicy(zoe_master.scheduler_policies.base.ZoeSchedulerPolicyBase):
+    """
+    Each user has a queue of executions in order of arrival. The next execution is taken from the user with the
+    lowest memory usage divided by their share, so that a user submitting many executions cannot monopolize
+    the cluster. Users not listed in the weights have a share of 1.
+
+    The memory usage of each user is updated incrementally when executions start and terminate. The queues can be
+    read by other threads, for statistics, so they are protected by a lock.
+    """
+    def __init__(self, weights: Dict[str, float]):
+        self.weights = weights
+        self.user_queues = {}  # type: Dict[str, List[Execution]]
+        self.usage = {}  # type: Dict[str, int]
+        self.lock = threading.Lock()
+
+    def add(self, execution: Execution) -> None:
+        """Add an execution to the end of its user queue."""
+        with self.lock:
+            self.user_queues.setdefault(execution.user_id, []).append(execution)
+
+    def remove(self, execution: Execution) -> None:
+        """Remove an execution from its user queue, if present."""
+        with self.lock:
+            user_queue = self.user_queues.get(execution.user_id, [])
+            if execution in user_queue:
+                user_queue.remove(execution)
+                if len(user_queue) == 0:
+                    del self.user_queues[execution.user_id]
+
+    def account(self, execution: Execution, memory_delta: int) -> None:
+        """Update the memory usage of the execution owner."""
+        with self.lock:
+            usage = self.usage.get(execution.user_id, 0) + memory_delta
+            if usage > 0:
+                self.usage[execution.user_id] = usage
+            else:
+                self.usage.pop(execution.user_id, None)
+
+    def ordered(self) -> List[Execution]:
+        """
+        Return a copy of the queue in fair-share order.
+
+        The order is built by repeatedly taking the next execution of the user with the lowest weighted usage,
+        assuming that each execution taken will reserve all the memory it requires.
+        """
+        with self.lock:
+            usage = dict(self.usage)
+            user_queues = dict([(user_id, list(user_queue)) for user_id, user_queue in self.user_queues.items()])
+        ret = []
+        while len(user_queues) > 0:
+            user_id = min(user_queues.keys(), key=lambda u: (usage.get(u, 0) / self.weights.get(u, 1), user_queues[u][0].time_submit))
+            execution = user_queues[user_id].pop(0)
+            ret.append(execution)
+            usage[user_id] = usage.get(user_id, 0) + execution_memory(execution)
+            if len(user_queues[user_id]) == 0:
+                del user_queues[user_id]
+        return ret
+
+    def __len__(self) -> int:
+        with self.lock:
+            return sum([len(user_queue) for user_queue in self.user_queues.values()])
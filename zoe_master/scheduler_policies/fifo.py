@@ -0,0 +1,45 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""First In, First Out scheduler policy."""
+
+from typing import List
+
+from zoe_lib.sql_manager import Execution
+import zoe_master.scheduler_policies.base
+
+
+class FIFOPolicy(zoe_master.scheduler_policies.base.ZoeSchedulerPolicyBase):
+    """Executions are started in order of arrival."""
+    def __init__(self):
+        self.queue = []
+
+    def add(self, execution: Execution) -> None:
+        """Add an execution to the end of the queue."""
+        self.queue.append(execution)
+
+    def remove(self, execution: Execution) -> None:
+        """Remove an execution from the queue, if present."""
+        try:
+            self.queue.remove(execution)
+        except ValueError:
+            pass
+
+    def ordered(self) -> List[Execution]:
+        """Return a copy of the queue, in order of arrival."""
+        return list(self.queue)
+
+    def __len__(self) -> int:
+        return len(self.queue)
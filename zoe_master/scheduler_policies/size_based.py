@@ -0,0 +1,61 @@
+# Copyright (c) 2016, Daniele Venzano
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Size-based (shortest expected job first) scheduler policy."""
+
+import datetime
+from typing import List
+
+from zoe_lib.sql_manager import Execution
+from zoe_master.exceptions import ZoeException
+from zoe_master.runtime_estimator import ZoeRuntimeEstimator
+from zoe_master.scheduler_policies.base import execution_memory
+import zoe_master.scheduler_policies.fifo
+
+
+class SizeBasedPolicy(zoe_master.scheduler_policies.fifo.FIFOPolicy):
+    """
+    Executions are started in order of increasing size, where the size is the memory reserved by all the services
+    multiplied by the expected run time.
+
+    Run times are estimated from the history of the same ZApp. ZApps with no history get the average of the
+    estimates of the other executions in the queue. To prevent starvation, the size used for ordering is divided by (1 + waiting time / aging time),
+    so that an execution that waited for aging_time seconds counts as half its size. An aging time of 0 disables aging.
+    """
+    def __init__(self, estimator: ZoeRuntimeEstimator, aging_time: int):
+        super().__init__()
+        if aging_time < 0:
+            raise ZoeException('The aging time of the size-based policy cannot be negative: {}'.format(aging_time))
+        self.estimator = estimator
+        self.aging_time = aging_time
+        self.clock = datetime.datetime.now  # replaced by the scheduler simulator
+
+    def ordered(self) -> List[Execution]:
+        """Return a copy of the queue, smaller executions first."""
+        runtimes = dict([(e.id, self.estimator.estimate(e)) for e in self.queue])
+        known = [r for r in runtimes.values() if r is not None]
+        default_runtime = sum(known) / len(known) if len(known) > 0 else 1
+        now = self.clock()
+
+        def aged_size(execution):
+            """Size of the execution, decreasing with the time it has been waiting."""
+            runtime = runtimes[execution.id] if runtimes[execution.id] is not None else default_runtime
+            size = execution_memory(execution) * runtime
+            if self.aging_time == 0:
+                return size
+            waiting = max(0, (now - execution.time_submit).total_seconds())
+            return size / (1 + waiting / self.aging_time)
+
+        return sorted(self.queue, key=aged_size)
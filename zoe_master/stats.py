@@ -26,6 +26,10 @@ class Stats:
     def __init__(self):
         self.timestamp = time.time()
 
+    def serialize(self):
+        """Generates a dictionary that can be serialized in JSON."""
+        raise NotImplementedError
+
 
 class SwarmNodeStats(Stats):
     """Stats related to a single Swarm node."""
@@ -44,6 +48,24 @@ class SwarmNodeStats(Stats):
         self.last_update = None
         self.server_version = None
 
+    def serialize(self):
+        """Generates a dictionary that can be serialized in JSON."""
+        return {
+            'timestamp': self.timestamp,
+            'name': self.name,
+            'docker_endpoint': self.docker_endpoint,
+            'container_count': self.container_count,
+            'cores_total': self.cores_total,
+            'cores_reserved': self.cores_reserved,
+            'memory_total': self.memory_total,
+            'memory_reserved': self.memory_reserved,
+            'labels': self.labels,
+            'status': self.status,
+            'error': self.error,
+            'last_update': self.last_update,
+            'server_version': self.server_version
+        }
+
 
 class SwarmStats(Stats):
     """Stats related to the whole Swarm cluster."""
@@ -58,6 +80,20 @@ class SwarmStats(Stats):
         self.status = 'Unknown'
         self.nodes = []
 
+    def serialize(self):
+        """Generates a dictionary that can be serialized in JSON."""
+        return {
+            'timestamp': self.timestamp,
+            'container_count': self.container_count,
+            'image_count': self.image_count,
+            'memory_total': self.memory_total,
+            'cores_total': self.cores_total,
+            'placement_strategy': self.placement_strategy,
+            'active_filters': self.active_filters,
+            'status': self.status,
+            'nodes': [node.serialize() for node in self.nodes]
+        }
+
 
 class SchedulerStats(Stats):
     """Stats related to the scheduler."""
@@ -19,24 +19,53 @@
 import logging
 
 from zoe_master.workspace.filesystem import ZoeFSWorkspace
+from zoe_master.placement import ZoePlacement
 from zoe_master.exceptions import ZoeStartExecutionRetryException, ZoeStartExecutionFatalException, ZoeException
 
 from zoe_lib.config import get_conf
 from zoe_lib.exceptions import ZoeLibException
-from zoe_lib.sql_manager import Execution, Service
+from zoe_lib.sql_manager import Execution, Service, query_stats
 from zoe_lib.swarm_client import DockerContainerOptions, SwarmClient
+from zoe_lib.tracing import span
 
 log = logging.getLogger(__name__)
 
 
-def execution_to_containers(execution: Execution) -> None:
+def execution_to_containers(execution: Execution, placement: ZoePlacement=None) -> None:
     """Translate an execution object into containers.
 
+    Only the essential services are started, the elastic ones are started later with service_to_container().
     If an error occurs some containers may have been created and needs to be cleaned-up.
     In case of error exceptions are raised.
+    If placement is None, the choice of the node for each service is left to Swarm.
     """
     ordered_service_list = sorted(execution.services, key=lambda x: x.description['startup_order'])
 
+    env_subst_dict = _gen_env_subst_dict(execution, ordered_service_list)
+
+    for service in ordered_service_list:
+        if not service.essential:
+            continue
+        env_subst_dict['dns_name#self'] = service.dns_name
+        with span('spawn_service', execution_id=execution.id, service=service.name), service.sql_manager.unit_of_work():
+            service.set_starting()
+            _spawn_service(execution, service, env_subst_dict, placement)
+
+
+def service_to_container(execution: Execution, service: Service, placement: ZoePlacement=None) -> None:
+    """Start a single service of an already running execution, used for elastic services.
+
+    In case of error exceptions are raised and the caller is responsible for cleaning up.
+    """
+    env_subst_dict = _gen_env_subst_dict(execution, execution.services)
+    env_subst_dict['dns_name#self'] = service.dns_name
+    with span('spawn_service', execution_id=execution.id, service=service.name), service.sql_manager.unit_of_work():
+        service.set_starting()
+        _spawn_service(execution, service, env_subst_dict, placement)
+
+
+def _gen_env_subst_dict(execution, service_list):
+    """Generate the dictionary used to substitute template strings in environment variables and commands."""
     env_subst_dict = {
         'execution_id': execution.id,
         "execution_name": execution.name,
@@ -44,13 +73,10 @@ def execution_to_containers(execution: Execution) -> None:
         'deployment_name': get_conf().deployment_name,
     }
 
-    for service in ordered_service_list:
+    for service in service_list:
         env_subst_dict['dns_name#' + service.name] = service.dns_name
 
-    for service in ordered_service_list:
-        env_subst_dict['dns_name#self'] = service.dns_name
-        service.set_starting()
-        _spawn_service(execution, service, env_subst_dict)
+    return env_subst_dict
 
 
 def _gen_environment(service, env_subst_dict, copts):
@@ -65,7 +91,7 @@ def _gen_environment(service, env_subst_dict, copts):
         copts.add_env_variable(env_name, env_value)
 
 
-def _spawn_service(execution: Execution, service: Service, env_subst_dict: dict):
+def _spawn_service(execution: Execution, service: Service, env_subst_dict: dict, placement: ZoePlacement):
     copts = DockerContainerOptions()
     copts.gelf_log_address = get_conf().gelf_address
     copts.name = service.dns_name
@@ -100,6 +126,13 @@ def _spawn_service(execution: Execution, service: Service, env_subst_dict: dict)
         for constraint in service.description['constraints']:
             copts.add_constraint(constraint)
 
+    if placement is not None and not any(c.startswith('constraint:node') for c in copts.constraints):
+        node = placement.choose_node(service.description['required_resources']['memory'], execution.id)
+        if node is None:
+            log.warning('No node has enough free memory for service {}, leaving placement to Swarm'.format(service.name))
+        elif placement.policy != 'swarm':
+            copts.add_constraint('constraint:node==' + node)
+
     fswk = ZoeFSWorkspace()
     if fswk.can_be_attached():
         copts.add_volume_bind(fswk.get_path(execution.user_id), fswk.get_mountpoint(), False)
@@ -113,13 +146,17 @@ def _spawn_service(execution: Execution, service: Service, env_subst_dict: dict)
     except Exception as e:
         raise ZoeStartExecutionFatalException(str(e))
 
+    timings = {}
     try:
-        cont_info = swarm.spawn_container(service.description['docker_image'], copts)
+        cont_info = swarm.spawn_container(service.description['docker_image'], copts, timings)
     except ZoeException as e:
         raise ZoeStartExecutionRetryException(str(e))
     except ZoeLibException as e:
         raise ZoeStartExecutionRetryException(str(e))
 
+    for stage, duration in timings.items():
+        execution.metric_stage('service_' + stage, duration, service.name)
+
     service.set_active(cont_info["docker_id"])
 
     if 'networks' in service.description:
@@ -134,13 +171,15 @@ def _spawn_service(execution: Execution, service: Service, env_subst_dict: dict)
 
 def terminate_execution(execution: Execution) -> None:
     """Terminate an execution, making sure no containers are left in Swarm."""
-    execution.set_cleaning_up()
-    swarm = SwarmClient(get_conf())
-    for service in execution.services:
-        assert isinstance(service, Service)
-        if service.docker_id is not None:
-            service.set_terminating()
-            swarm.terminate_container(service.docker_id, delete=True)
-            service.set_inactive()
-            log.debug('Service {} terminated'.format(service.name))
-    execution.set_terminated()
+    with span('terminate_execution', execution_id=execution.id), query_stats('terminate_execution'):
+        execution.set_cleaning_up()
+        swarm = SwarmClient(get_conf())
+        with execution.sql_manager.unit_of_work():
+            for service in execution.services:
+                assert isinstance(service, Service)
+                if service.docker_id is not None:
+                    service.set_terminating()
+                    swarm.terminate_container(service.docker_id, delete=True)
+                    service.set_inactive()
+                    log.debug('Service {} terminated'.format(service.name))
+            execution.set_terminated()